@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Micro and macro benchmarks for the medallion pipeline hot paths.
+# Run with: python -m benchmarks.run --help
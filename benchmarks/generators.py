@@ -0,0 +1,46 @@
+# benchmarks/generators.py
+# Synthetic data shaped like the real RentCast payloads and the tables built from them.
+import json
+
+from rentcast_simulator import SIMULATOR_DEFAULTS, STATE_GEO, synthetic_listing
+
+STATES = list(STATE_GEO)
+
+
+def bronze_documents(kind, count, states=None, seed=42, as_json=False):
+    """`count` bronze listings spread evenly over `states` (kind is "sale" or "rental").
+
+    The documents carry the nested listingAgent/listingOffice/history fields, so
+    json_normalize and JSON (de)serialisation costs are realistic.
+    """
+    states = states or STATES
+    settings = {**SIMULATOR_DEFAULTS, "listings_per_state": count, "seed": seed}
+    docs = [synthetic_listing(kind, states[i % len(states)], i // len(states), settings) for i in range(count)]
+    if as_json:
+        return [json.dumps(doc) for doc in docs]
+    return docs
+
+
+def bronze_rows(kind, count, states=None, seed=42, as_json=False):
+    """Rows as `SELECT id, raw_json FROM bronze_*` returns them, raw_json as dict (JSONB) or str."""
+    return [(i + 1, doc) for i, doc in enumerate(bronze_documents(kind, count, states, seed, as_json))]
+
+
+def gold_listing_records(kind, count, states=None, seed=42):
+    """Dicts with the gold_*_listings columns the dashboard reads."""
+    records = []
+    for i, doc in enumerate(bronze_documents(kind, count, states, seed)):
+        records.append({
+            "listing_id": i + 1,
+            "formatted_address": doc["formattedAddress"],
+            "property_type": doc["propertyType"],
+            "price": doc["price"],
+            "status": doc["status"],
+            "city": doc["city"],
+            "state": doc["state"],
+            "zip_code": doc["zipCode"],
+            "bedrooms": doc["bedrooms"],
+            "bathrooms": doc["bathrooms"],
+            "square_feet": doc["squareFootage"],
+        })
+    return records
@@ -0,0 +1,88 @@
+# benchmarks/harness.py
+# Timing, result files and baseline comparison shared by the micro and macro suites.
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.10  # flag anything more than 10% slower than baseline
+
+
+def bench(name, func, setup=None, repeat=5, rows=None):
+    """Time `func` `repeat` times; `setup()` runs untimed before each call and its
+    return value is passed to `func`."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        samples.append(time.perf_counter() - start)
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    if rows:
+        result["rows"] = rows
+        result["rows_per_s"] = rows / result["median_s"] if result["median_s"] else None
+    print(f"{name:<45} median {result['median_s'] * 1000:>10.2f} ms   min {result['min_s'] * 1000:>10.2f} ms")
+    return result
+
+
+def save_results(results, path=None):
+    payload = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "results": results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return {r["name"]: r for r in json.load(f)["results"]}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare median timings against a baseline; returns (rows, regressions)."""
+    rows, regressions = [], []
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            rows.append((result["name"], None, result["median_s"], None, "new"))
+            continue
+        change = (result["median_s"] - base["median_s"]) / base["median_s"] if base["median_s"] else 0.0
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(result["name"])
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((result["name"], base["median_s"], result["median_s"], change, status))
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, threshold=DEFAULT_THRESHOLD):
+    print(f"\n{'benchmark':<45}{'baseline ms':>13}{'current ms':>13}{'change':>9}  status")
+    for name, base, current, change, status in rows:
+        base_ms = f"{base * 1000:.2f}" if base is not None else "-"
+        change_pct = f"{change:+.1%}" if change is not None else "-"
+        print(f"{name:<45}{base_ms:>13}{current * 1000:>13.2f}{change_pct:>9}  {status}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"\nNo regressions over {threshold:.0%}.")
@@ -0,0 +1,155 @@
+# benchmarks/macro.py
+# Per-stage benchmarks against a throwaway database on the configured Postgres
+# server. The database is created for the run and dropped afterwards. Each stage runs the
+# pipeline's own unit: bronze_ingest.ingest_unit (with the API fetch replaced by the
+# generated page), silver_transform.transform_unit and gold_load.load_gold.
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+
+from config import POSTGRES
+import bronze_ingest
+import silver_transform
+import gold_load
+from benchmarks.generators import bronze_documents
+from benchmarks.harness import bench
+from etl_recovery import current_run_id
+from schema_manager import ensure_indexes
+from utils import get_db_connection, get_watermark
+
+
+@contextmanager
+def disposable_database(name=None):
+    """Create an empty database, point POSTGRES at it, drop it on exit."""
+    name = name or f"zipco_bench_{os.getpid()}"
+    original = POSTGRES["database"]
+    admin = psycopg2.connect(**{**POSTGRES, "database": "postgres"})
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        cur.execute(f'CREATE DATABASE "{name}"')
+    POSTGRES["database"] = name  # shared dict, so the pipeline modules follow
+    try:
+        yield name
+    finally:
+        POSTGRES["database"] = original
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        admin.close()
+
+
+def _reset_bronze(table):
+    # Forget the change-detection hashes too, otherwise repeats would skip every listing
+    conn = get_db_connection(POSTGRES)
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {table}")
+        cur.execute("DELETE FROM bronze_listing_index WHERE bronze_table = %s", [table])
+    conn.commit()
+    conn.close()
+
+
+@contextmanager
+def served_page(data):
+    """Make bronze_ingest's units get `data` instead of calling the API."""
+    original = bronze_ingest._fetch_or_raise
+    bronze_ingest._fetch_or_raise = lambda endpoint, params: data
+    try:
+        yield
+    finally:
+        bronze_ingest._fetch_or_raise = original
+
+
+def _ingest(table, data, run_id):
+    # limit above the page size: a complete first page, so delistings are checked too
+    with served_page(data):
+        return bronze_ingest.ingest_unit(table, "BENCH", 0, "bench://", {"limit": len(data) + 1}, run_id)
+
+
+def _reset_gold(conn):
+    # Forget the incremental watermarks, so every repetition rebuilds the sketches and yields
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM etl_watermarks WHERE name LIKE 'sketch:%' OR name LIKE 'yield:%'")
+    conn.commit()
+
+
+def _refresh_gold_listings(conn):
+    # Same projection dashboard.refresh_gold_tables builds for the dashboard to read
+    with conn.cursor() as cur:
+        cur.execute("""
+            DROP TABLE IF EXISTS gold_sales_listings;
+            CREATE TABLE gold_sales_listings AS
+            SELECT id AS listing_id, address AS formatted_address, property_type, price, status,
+                   city, state, zip_code, bedrooms, bathrooms, sqft AS square_feet
+            FROM silver_sales;
+        """)
+    conn.commit()
+
+
+def run_macro(size=10_000, repeat=3):
+    results = []
+    sales = bronze_documents("sale", size)
+    rentals = bronze_documents("rental", size)
+    run_id = f"bench-{current_run_id()}"
+
+    with disposable_database():
+        # bronze: a fresh table per repetition so every run inserts `size` rows
+        results.append(bench(
+            "macro.bronze.ingest_unit",
+            lambda _: _ingest("bronze_sales_bench", sales, run_id),
+            setup=lambda: _reset_bronze("bronze_sales_bench") if _table_exists("bronze_sales_bench") else None,
+            repeat=repeat, rows=size,
+        ))
+        _ingest("bronze_rentals_bench", rentals, run_id)
+
+        conn = get_db_connection(POSTGRES)
+        silver_transform.create_silver_tables(conn)
+        get_watermark(conn, "bronze_sales_bench")  # creates etl_watermarks for reset_silver
+
+        def reset_silver():
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE silver_sales, silver_rentals")
+                cur.execute("DELETE FROM etl_watermarks WHERE name = 'bronze_sales_bench'")
+            conn.commit()
+
+        results.append(bench(
+            "macro.silver.transform_unit",
+            lambda _: silver_transform.transform_unit(conn, "bronze_sales_bench", run_id),
+            setup=reset_silver, repeat=repeat, rows=size,
+        ))
+        silver_transform.transform_unit(conn, "bronze_rentals_bench", run_id)
+
+        # gold: summaries, geo cells, sketches and yields; rebuilt from scratch, then a no-change run
+        results.append(bench("macro.gold.load_gold", lambda _: gold_load.load_gold(conn),
+                             setup=lambda: _reset_gold(conn), repeat=repeat, rows=size * 2))
+        results.append(bench("macro.gold.load_gold_incremental", lambda: gold_load.load_gold(conn),
+                             repeat=repeat))
+
+        _refresh_gold_listings(conn)
+        ensure_indexes(conn)
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT state, city FROM gold_sales_listings GROUP BY state, city ORDER BY COUNT(*) DESC LIMIT 1
+            """)
+            state, city = cur.fetchone()
+
+        # dashboard.load_listings behind st.cache_data: the filtered query of a cache miss
+        def load_listings():
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM gold_sales_listings WHERE state = ANY(%s) AND city = ANY(%s)",
+                            [[state], [city]])
+                return pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+        results.append(bench("macro.dashboard.load_listings", load_listings, repeat=repeat))
+        conn.close()
+    return results
+
+
+def _table_exists(table):
+    conn = get_db_connection(POSTGRES)
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", [table])
+        exists = cur.fetchone()[0] is not None
+    conn.close()
+    return exists
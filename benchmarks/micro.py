@@ -0,0 +1,138 @@
+# benchmarks/micro.py
+# In-process microbenchmarks: the Python side of each hot function with the
+# database replaced by an in-memory cursor, so only parsing/extraction/serialisation
+# cost is measured. SQL-bound work (gold_load.load_gold, dashboard.load_listings) lives in macro.py.
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2.extras
+
+import bronze_ingest
+import quantile_sketches
+import silver_transform
+from benchmarks.generators import bronze_rows, gold_listing_records
+from benchmarks.harness import bench
+
+
+class FakeCursor:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.executed = 0
+
+    def execute(self, query, params=None):
+        self.executed += 1
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return (0,)  # watermarks / MAX(id) lookups: nothing processed yet
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pipeline functions."""
+
+    def __init__(self, rows=None):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def patched(module, **replacements):
+    originals = {name: getattr(module, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+
+def bench_transform_table(size, repeat):
+    written = []
+    results = []
+    # the pipeline modules import execute_values where they call it, so patch it at the source
+    with patched(psycopg2.extras, execute_values=lambda cur, query, rows, template=None: written.append(sum(1 for _ in rows))):
+        for label, as_json in (("jsonb", False), ("text", True)):
+            conn = FakeConnection(bronze_rows("rental", size, as_json=as_json))
+            results.append(bench(
+                f"micro.silver.transform_table[{label}]",
+                lambda: silver_transform.transform_table(conn, "bronze_rentals_tx", "silver_rentals", is_rental=True),
+                repeat=repeat, rows=size,
+            ))
+    return results
+
+
+def bench_transform_sales(size, repeat):
+    df = pd.DataFrame({"raw_json": [row[1] for row in bronze_rows("sale", size, as_json=True)]})
+    return [bench("micro.silver.transform_sales", lambda: silver_transform.transform_sales(df),
+                  repeat=repeat, rows=size)]
+
+
+def bench_ingest_unit(size, repeat):
+    data = [row[1] for row in bronze_rows("sale", size)]
+    with patched(bronze_ingest,
+                 get_db_connection=lambda config: FakeConnection(),
+                 create_table_if_not_exists=lambda conn, table_name: None,
+                 _fetch_or_raise=lambda endpoint, params: data), \
+            patched(psycopg2.extras, execute_values=lambda cur, query, rows, template=None: None):
+        # Every listing is new to the empty fake index, so this is the worst case (all hashed and written)
+        return [bench("micro.bronze.ingest_unit",
+                      lambda: bronze_ingest.ingest_unit("bronze_sales_tx", "TX", 0, "bench://", {"limit": size}),
+                      repeat=repeat, rows=size)]
+
+
+def bench_sketches(size, repeat):
+    """Building the per-group sketches, and the merge the dashboard does for its median/p90 KPIs."""
+    records = gold_listing_records("sale", size)
+    rows = [(r["state"], r["city"], r["property_type"], r["status"], r["price"], r["square_feet"])
+            for r in records]
+    states = sorted({r["state"] for r in records})[:5]
+    types = sorted({r["property_type"] for r in records})[:3]
+
+    def build():
+        groups = {}
+        quantile_sketches._add_rows(groups, "sales", rows)
+        return groups
+
+    groups = build()
+    edges = quantile_sketches.HISTOGRAM_EDGES[("sales", "price")]
+    # what merged() reads back from gold_price_sketches for this filter
+    stored = [(d.sketch.to_json(), d.histogram) for (state, _, property_type, _), metrics in groups.items()
+              if state in states and property_type in types for d in [metrics["price"]]]
+
+    def merge():
+        result = quantile_sketches.Distribution(edges)
+        for sketch, histogram in stored:
+            result.merge(quantile_sketches.Distribution(edges, quantile_sketches.KLLSketch.from_json(sketch),
+                                                        histogram))
+        return result.sketch.n, result.sketch.quantile(0.5), result.sketch.quantile(0.9)
+
+    return [
+        bench("micro.gold.build_sketches", build, repeat=repeat, rows=size),
+        bench("micro.dashboard.merge_sketches", merge, repeat=repeat, rows=size),
+    ]
+
+
+def run_micro(size=10_000, repeat=5):
+    results = []
+    results += bench_transform_table(size, repeat)
+    results += bench_transform_sales(size, repeat)
+    results += bench_ingest_unit(size, repeat)
+    results += bench_sketches(size, repeat)
+    return results
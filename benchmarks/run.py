@@ -0,0 +1,60 @@
+# benchmarks/run.py
+# Run the benchmark suites, save the results as JSON and compare them with a baseline.
+#
+#   python -m benchmarks.run --micro                 # no database needed
+#   python -m benchmarks.run --macro --size 50000    # needs a reachable Postgres server
+#   python -m benchmarks.run --startup               # cold-start time per entry point
+#   python -m benchmarks.run --micro --save-baseline # store the current numbers as the baseline
+import argparse
+import os
+import sys
+
+from benchmarks.harness import (BASELINE_PATH, DEFAULT_THRESHOLD, compare, load_results,
+                                print_comparison, save_results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medallion pipeline benchmarks")
+    parser.add_argument("--micro", action="store_true", help="run in-process microbenchmarks")
+    parser.add_argument("--macro", action="store_true", help="run per-stage benchmarks on a disposable database")
+    parser.add_argument("--startup", action="store_true", help="time a fresh interpreter importing each entry point")
+    parser.add_argument("--size", type=int, default=10_000, help="synthetic listings per benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="results file (default benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    if not args.micro and not args.macro and not args.startup:
+        args.micro = True
+
+    results = []
+    if args.micro:
+        from benchmarks.micro import run_micro
+        results += run_micro(args.size, args.repeat)
+    if args.macro:
+        from benchmarks.macro import run_macro
+        results += run_macro(args.size, args.repeat)
+    if args.startup:
+        from benchmarks.startup import run_startup
+        results += run_startup(args.repeat)
+
+    path = save_results(results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    rows, regressions = compare(results, load_results(args.baseline), args.threshold)
+    print_comparison(rows, regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
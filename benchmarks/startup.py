@@ -0,0 +1,86 @@
+# benchmarks/startup.py
+# Cold-start cost of each entry point: a fresh interpreter per sample (like the Airflow
+# tasks, which spawn one process per stage) timed end to end, plus the `python -X importtime`
+# breakdown of which imports that time goes to. dashboard.py renders the page and queries
+# Postgres when imported, so its cold start is timed by the imports it starts with.
+#
+#   python -m benchmarks.startup            # or: python -m benchmarks.run --startup
+import importlib.util
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import bench
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = [
+    "bronze_ingest", "silver_transform", "gold_load", "schema_manager",
+    "quantile_sketches", "yield_match", "response_cache", "load_test",
+]
+# Scripts that do their work at import time -> the modules they import first
+SCRIPT_IMPORTS = {"dashboard": ["streamlit", "pandas", "altair", "sqlalchemy"]}
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                          capture_output=True, text=True, check=True).stderr
+
+
+def import_breakdown(module, top=3):
+    """(cumulative import ms of `module`, its `top` heaviest direct imports as (name, ms))."""
+    children, total = [], None
+    for line in _run(f"import {module}").splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                total = int(cumulative) / 1000
+                break
+            children = []  # a sibling top-level import finished; its children don't count
+        elif depth == 1:
+            children.append((name, int(cumulative) / 1000))
+    return total, sorted(children, key=lambda child: child[1], reverse=True)[:top]
+
+
+def script_breakdown(imports):
+    """(cumulative import ms of these top-level imports together, each as (name, ms))."""
+    times = {}
+    for line in _run(f"import {', '.join(imports)}").splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and name.strip() in imports and len(name) - len(name.lstrip()) == 1:
+            times[name.strip()] = int(cumulative) / 1000
+    heaviest = sorted(times.items(), key=lambda child: child[1], reverse=True)
+    return sum(times.values()), heaviest
+
+
+def run_startup(repeat=5, modules=None):
+    results = [bench("startup.python", lambda: _run("pass"), repeat=repeat)]
+    for module in modules or ENTRY_POINTS + list(SCRIPT_IMPORTS):
+        imports = SCRIPT_IMPORTS.get(module, [module])
+        missing = [name for name in imports if importlib.util.find_spec(name) is None]
+        if missing:
+            print(f"startup.{module}: skipped, {', '.join(missing)} not installed")
+            continue
+        code = f"import {', '.join(imports)}"
+        _run(code)  # untimed, so .pyc files exist and every sample starts alike
+        result = bench(f"startup.{module}", lambda: _run(code), repeat=repeat)
+        if module in SCRIPT_IMPORTS:
+            result["import_ms"], heaviest = script_breakdown(imports)
+        else:
+            result["import_ms"], heaviest = import_breakdown(module)
+        result["heaviest_imports"] = [{"module": name, "ms": ms} for name, ms in heaviest]
+        print(f"{'':<45} import {result['import_ms']:>10.2f} ms   "
+              + ", ".join(f"{name} {ms:.1f} ms" for name, ms in heaviest))
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    run_startup()
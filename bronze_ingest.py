@@ -1,7 +1,11 @@
-import requests
+import argparse
 import json
-from config import API_KEY, BASE_URL, POSTGRES
+import response_cache
+from config import API_KEY, BASE_URL, BRONZE_PAGING, PARQUET_LAKE, POSTGRES
 from utils import get_db_connection, create_table_if_not_exists
+from change_detection import create_change_tables, detect_changes, detect_delisted, listing_key, record_changes
+from etl_recovery import (DONE, FAILED, checkpoint, completed_units, create_recovery_tables, current_run_id,
+                          dead_letter, dead_letters)
 
 #  Define U.S. states once, at the top
 US_STATES = [
@@ -12,78 +16,240 @@ US_STATES = [
     "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"
 ]
 
+def apply_cli_args(argv=None):
+    """--record / --replay / --no-cache pick the response cache mode for this run."""
+    parser = argparse.ArgumentParser(description="Bronze ingestion from the RentCast API")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", dest="cache_mode", action="store_const", const="record",
+                      help="always call the API and store every response in the local cache")
+    mode.add_argument("--replay", dest="cache_mode", action="store_const", const="replay",
+                      help="rebuild bronze from cached responses only, without network access")
+    mode.add_argument("--no-cache", dest="cache_mode", action="store_const", const="off")
+    args = parser.parse_args(argv)
+    if args.cache_mode:
+        response_cache.set_mode(args.cache_mode)
+
 def fetch_listings(endpoint, params):
+    cached = response_cache.lookup(endpoint, params)
+    if cached is not None:
+        return cached
+    import requests  # not needed at all when the response is cached or replayed
     headers = {
         "accept": "application/json",
         "X-Api-Key": API_KEY   #  API_KEY comes from config.py
     }
-    response = requests.get(endpoint, headers=headers, params=params)
+    response = requests.get(endpoint, headers=headers, params=params, timeout=10)
     response.raise_for_status()
-    return response.json()
+    data = response.json()
+    response_cache.store(endpoint, params, data)
+    return data
 
-def save_to_bronze(table_name, data):
+def save_to_bronze(table_name, data, complete=False):
+    """Store the new/changed listings of `data`; `complete` means it is every listing for
+    the table (a fetch shorter than its limit), so the missing ones are marked delisted."""
     conn = get_db_connection(POSTGRES)
     create_table_if_not_exists(conn, table_name)
+    create_change_tables(conn)
     with conn.cursor() as cur:
-        for record in data:
+        # Only new or changed listings are stored; the rest are already in bronze
+        changed, events = detect_changes(cur, table_name, data, track_delisted=complete)
+        for record in changed:
             cur.execute(
                 f"INSERT INTO {table_name} (raw_json) VALUES (%s)",
                 [json.dumps(record)]
             )
+        record_changes(cur, table_name, events)
+        if PARQUET_LAKE["enabled"]:
+            import parquet_store  # pyarrow is only needed when the Parquet copy is on
+            parquet_store.write_bronze(table_name, changed)
     conn.commit()
     conn.close()
 
-def run_bronze():
-    # Loop over all states for Active Sales Listings
-    sales_url = f"{BASE_URL}/sale"
-    for state in US_STATES:
-        sales_params = {"state": state, "status": "Active", "limit": 50}
-        sales_data = fetch_listings(sales_url, sales_params)
-        save_to_bronze(f"bronze_sales_{state.lower()}", sales_data)
-
-    # Loop over all states for Active Rental Listings
-    rentals_url = f"{BASE_URL}/rental/long-term"
-    for state in US_STATES:
-        rentals_params = {"state": state, "status": "Active", "limit": 50}
-        rentals_data = fetch_listings(rentals_url, rentals_params)
-        save_to_bronze(f"bronze_rentals_{state.lower()}", rentals_data)
-
-    print("Bronze ingestion complete for all states!")
+# The logging variant further down redefines fetch_listings to return [] on errors;
+# units need the version that raises, so the failure can be checkpointed
+_fetch_or_raise = fetch_listings
+
+def _malformed(record):
+    if not isinstance(record, dict):
+        return "listing is not a JSON object"
+    if not (record.get("id") or record.get("formattedAddress")):
+        return "listing has neither id nor formattedAddress"
+    return None
+
+def ingest_unit(table_name, state, page, endpoint, params, run_id=None, seen=None):
+    """Fetch and store one page as a checkpointed unit. Returns the number of listings
+    fetched, or None when the unit failed (its request/error is then dead-lettered).
+
+    A first page shorter than its limit is every listing for the table, so the listings
+    missing from it are marked delisted. The keys of the stored listings are added to `seen`.
+    """
+    run_id = run_id or current_run_id()
+    request = {"endpoint": endpoint, "params": params}
+    conn = get_db_connection(POSTGRES)
+    try:
+        create_recovery_tables(conn)
+        try:
+            data = _fetch_or_raise(endpoint, params)
+            if not isinstance(data, list):
+                raise ValueError(f"expected a list of listings, got {type(data).__name__}: {str(data)[:200]}")
+        except Exception as e:
+            with conn.cursor() as cur:
+                dead_letter(cur, run_id, "bronze", table_name, request, repr(e), page)
+                checkpoint(cur, run_id, "bronze", table_name, page, FAILED, state, error=repr(e), request=request)
+            conn.commit()
+            return None
+
+        create_table_if_not_exists(conn, table_name)
+        create_change_tables(conn)
+        checked = [(i, record, _malformed(record)) for i, record in enumerate(data)]
+        bad = [letter for letter in checked if letter[2]]
+        records = [record for _, record, problem in checked if not problem]
+        limit = (params or {}).get("limit")
+        complete = page == 0 and limit is not None and len(data) < int(limit)
+        try:
+            with conn.cursor() as cur:
+                changed, events = detect_changes(cur, table_name, records, track_delisted=complete)
+                for record in changed:
+                    cur.execute(f"INSERT INTO {table_name} (raw_json) VALUES (%s)", [json.dumps(record)])
+                record_changes(cur, table_name, events)
+                dead_letters(cur, run_id, "bronze", table_name, bad, page)
+                checkpoint(cur, run_id, "bronze", table_name, page, DONE, state, records=len(data), request=request)
+                if PARQUET_LAKE["enabled"]:
+                    # before the commit, so a failed lake write fails the unit and it is retried
+                    import parquet_store  # pyarrow is only needed when the Parquet copy is on
+                    parquet_store.write_bronze(table_name, changed)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            with conn.cursor() as cur:
+                dead_letter(cur, run_id, "bronze", table_name, request, repr(e), page)
+                checkpoint(cur, run_id, "bronze", table_name, page, FAILED, state, error=repr(e), request=request)
+            conn.commit()
+            return None
+    finally:
+        conn.close()
+    if seen is not None:
+        seen.update(listing_key(record) for record in records)
+    return len(data)
+
+def delist_missing(table_name, seen):
+    """Mark the listings of `table_name` missing from `seen`, the keys of a complete
+    multi-page fetch, delisted. Returns how many were."""
+    conn = get_db_connection(POSTGRES)
+    try:
+        with conn.cursor() as cur:
+            events = detect_delisted(cur, table_name, seen)
+            record_changes(cur, table_name, events)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(events)
+
+def ingest_state(kind, state, run_id=None, done=None, base_url=None):
+    """All pages of one state/endpoint; pages already done in this run are skipped.
+
+    When the last page comes back short, every page was fetched by this call and none
+    failed, the listings not seen on any page are marked delisted.
+    """
+    base_url = base_url or BASE_URL
+    endpoint = f"{base_url}/sale" if kind == "sales" else f"{base_url}/rental/long-term"
+    table_name = f"bronze_{kind}_{state.lower()}"
+    page_size, max_pages = BRONZE_PAGING["page_size"], BRONZE_PAGING["max_pages"]
+    failed, seen, fetched_here = 0, set(), True
+    for page in range(max_pages):
+        fetched = (done or {}).get((table_name, page))
+        if fetched is None:
+            params = {"state": state, "status": "Active", "limit": page_size}
+            if page:
+                params["offset"] = page * page_size
+            fetched = ingest_unit(table_name, state, page, endpoint, params, run_id, seen)
+            failed += fetched is None
+        else:
+            fetched_here = False  # done by an earlier attempt: its listings aren't in `seen`
+        if fetched is not None and fetched < page_size:
+            # short page: nothing further to fetch. A single page handled delistings itself.
+            if page and fetched_here and not failed:
+                try:
+                    delist_missing(table_name, seen)
+                except Exception as e:
+                    print(f"Delisting pass for {table_name} failed ({e!r}); the next complete fetch redoes it")
+            break
+    return failed
+
+def run_bronze(run_id=None):
+    run_id = run_id or current_run_id()
+    conn = get_db_connection(POSTGRES)
+    create_recovery_tables(conn)
+    done = completed_units(conn, run_id, "bronze")  # rerunning a run only redoes what's missing
+    conn.close()
+
+    # Loop over all states for Active Sales Listings, then Active Rental Listings
+    failed = 0
+    for kind in ("sales", "rentals"):
+        for state in US_STATES:
+            failed += ingest_state(kind, state, run_id, done)
+
+    if failed:
+        print(f"Bronze ingestion finished with {failed} failed unit(s); "
+              f"retry them with: python etl_recovery.py resume --run-id {run_id}")
+    else:
+        print("Bronze ingestion complete for all states!")
 
 if __name__ == "__main__":
+    apply_cli_args()
     run_bronze()
 
 
 # To handle Logging & Error Handling issues at the  Bronze Layer
-import requests
 import json
-from config import API_KEY, BASE_URL, POSTGRES
+import response_cache
+from config import API_KEY, BASE_URL, PARQUET_LAKE, POSTGRES
 from utils import get_db_connection, create_table_if_not_exists
+from change_detection import DELISTED, create_change_tables, detect_changes, record_changes
 from logging_config import logger
 
 def fetch_listings(endpoint, params):
+    try:
+        cached = response_cache.lookup(endpoint, params)
+    except response_cache.CacheMiss as e:
+        logger.error(f"Replay failed: {e}")
+        return []
+    if cached is not None:
+        logger.info(f"Using cached response for {endpoint} with params {params}")
+        return cached
+    import requests  # only imported on a cache miss
     headers = {"accept": "application/json", "X-Api-Key": API_KEY}
     try:
         response = requests.get(endpoint, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         logger.info(f"Fetched data from {endpoint} with params {params}")
-        return response.json()
+        data = response.json()
+        response_cache.store(endpoint, params, data)
+        return data
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to fetch data: {e}")
         return []  # Return empty list instead of crashing
 
-def save_to_bronze(table_name, data):
+def save_to_bronze(table_name, data, complete=False):
     if not data:
         logger.warning(f"No data to insert into {table_name}")
         return
     try:
         conn = get_db_connection(POSTGRES)
         create_table_if_not_exists(conn, table_name)
+        create_change_tables(conn)
         with conn.cursor() as cur:
-            for record in data:
+            changed, events = detect_changes(cur, table_name, data, track_delisted=complete)
+            for record in changed:
                 cur.execute(f"INSERT INTO {table_name} (raw_json) VALUES (%s)", [json.dumps(record)])
+            record_changes(cur, table_name, events)
+            if PARQUET_LAKE["enabled"]:
+                import parquet_store  # pyarrow is only needed when the Parquet copy is on
+                parquet_store.write_bronze(table_name, changed)
         conn.commit()
-        logger.info(f"Inserted {len(data)} rows into {table_name}")
+        delisted = sum(1 for _, change_type, _ in events if change_type == DELISTED)
+        logger.info(f"Inserted {len(changed)} new/changed rows into {table_name} "
+                    f"({len(data) - len(changed)} unchanged skipped, {delisted} delisted)")
     except Exception as e:
         logger.error(f"Error inserting data into {table_name}: {e}")
     finally:
@@ -94,17 +260,28 @@ def run_bronze():
         logger.info("Starting Bronze ETL stage...")
         sales_url = f"{BASE_URL}/sale"
         sales_params = {"city": "Austin", "state": "TX", "status": "Active", "limit": 50}
-        sales_data = fetch_listings(sales_url, sales_params)
-        save_to_bronze("bronze_sales", sales_data)
-
         rentals_url = f"{BASE_URL}/rental/long-term"
         rentals_params = {"city": "Austin", "state": "TX", "status": "Active", "limit": 50}
-        rentals_data = fetch_listings(rentals_url, rentals_params)
-        save_to_bronze("bronze_rentals", rentals_data)
 
-        logger.info("Bronze ETL completed successfully.")
+        # Checkpointed units: a failed request is dead-lettered instead of silently storing nothing
+        failed = 0
+        for table_name, url, params in (("bronze_sales", sales_url, sales_params),
+                                        ("bronze_rentals", rentals_url, rentals_params)):
+            fetched = ingest_unit(table_name, "TX", 0, url, params)
+            if fetched is None:
+                failed += 1
+                logger.error(f"Failed to ingest {table_name}; request and error are in etl_dead_letters")
+            else:
+                logger.info(f"Ingested {fetched} listings into {table_name}")
+
+        if failed:
+            logger.warning(f"Bronze ETL finished with {failed} failed unit(s); "
+                           f"retry with: python etl_recovery.py resume --run-id {current_run_id()}")
+        else:
+            logger.info("Bronze ETL completed successfully.")
     except Exception as e:
         logger.critical(f"Unexpected error in Bronze ETL: {e}", exc_info=True)
 
 if __name__ == "__main__":
+    apply_cli_args()
     run_bronze()
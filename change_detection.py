@@ -0,0 +1,132 @@
+# change_detection.py
+# Content hashing of RentCast listings so bronze only stores listings that are new or
+# changed since the last run, plus an event log of new/changed/delisted listings.
+import hashlib
+import json
+
+NEW, CHANGED, DELISTED = "new", "changed", "delisted"
+
+# RentCast bumps these on every crawl of an unchanged listing, so they are left out of the hash
+VOLATILE_FIELDS = ("lastSeenDate", "daysOnMarket")
+
+
+def _stable_view(record):
+    view = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    history = view.get("history")
+    if isinstance(history, dict):
+        view["history"] = {
+            date: {k: v for k, v in event.items() if k not in VOLATILE_FIELDS} if isinstance(event, dict) else event
+            for date, event in history.items()
+        }
+    return view
+
+
+def listing_hash(record):
+    """16-byte digest of the listing after canonical JSON serialisation."""
+    canonical = json.dumps(_stable_view(record), sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def listing_key(record, content_hash=None):
+    """Key of a listing in bronze_listing_index and silver's listing_id.
+
+    RentCast ids are stable per property; fall back to the address, then the hash itself.
+    """
+    return record.get("id") or record.get("formattedAddress") or (content_hash or listing_hash(record)).hex()
+
+
+def create_change_tables(conn):
+    with conn.cursor() as cur:
+        # One row per listing ever seen in a bronze table, holding its last hash
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS bronze_listing_index (
+            bronze_table TEXT NOT NULL,
+            listing_id TEXT NOT NULL,
+            content_hash BYTEA NOT NULL,
+            active BOOLEAN NOT NULL DEFAULT TRUE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (bronze_table, listing_id)
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS bronze_change_events (
+            id SERIAL PRIMARY KEY,
+            bronze_table TEXT NOT NULL,
+            listing_id TEXT NOT NULL,
+            change_type TEXT NOT NULL,
+            content_hash BYTEA,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+    conn.commit()
+
+
+def detect_changes(cur, table_name, records, track_delisted=False):
+    """Split a fetch for `table_name` into records worth storing and change events.
+
+    Returns (changed_records, events) where events are (listing_id, change_type, hash).
+    With `track_delisted`, listings in the index but missing from `records` are reported
+    as delisted, so only turn it on when `records` is known to be every listing (e.g. a
+    fetch that came back shorter than its limit), never for a limit-truncated page.
+    """
+    cur.execute(
+        "SELECT listing_id, content_hash, active FROM bronze_listing_index WHERE bronze_table = %s",
+        [table_name],
+    )
+    known = {listing_id: (bytes(content_hash), active) for listing_id, content_hash, active in cur.fetchall()}
+
+    latest = {}
+    for record in records:
+        if not record:
+            continue
+        content_hash = listing_hash(record)
+        latest[listing_key(record, content_hash)] = (record, content_hash)  # last copy wins
+
+    changed_records, events = [], []
+    for key, (record, content_hash) in latest.items():
+        previous = known.get(key)
+        if previous is None or not previous[1]:
+            change_type = NEW
+        elif previous[0] != content_hash:
+            change_type = CHANGED
+        else:
+            continue
+        changed_records.append(record)
+        events.append((key, change_type, content_hash))
+
+    if track_delisted:
+        for key, (content_hash, active) in known.items():
+            if active and key not in latest:
+                events.append((key, DELISTED, content_hash))
+    return changed_records, events
+
+
+def detect_delisted(cur, table_name, seen_keys):
+    """Delisted events for the active listings of `table_name` whose keys aren't in
+    `seen_keys`, the keys of a complete fetch spread over several pages."""
+    cur.execute(
+        "SELECT listing_id, content_hash FROM bronze_listing_index WHERE bronze_table = %s AND active",
+        [table_name],
+    )
+    return [(key, DELISTED, bytes(content_hash)) for key, content_hash in cur.fetchall() if key not in seen_keys]
+
+
+def record_changes(cur, table_name, events):
+    """Append the change events and update the hash index (same transaction as the insert)."""
+    from psycopg2.extras import execute_values
+    if not events:
+        return
+    execute_values(cur, """
+        INSERT INTO bronze_change_events (bronze_table, listing_id, change_type, content_hash)
+        VALUES %s
+    """, [(table_name, key, change_type, content_hash) for key, change_type, content_hash in events])
+
+    execute_values(cur, """
+        INSERT INTO bronze_listing_index (bronze_table, listing_id, content_hash, active)
+        VALUES %s
+        ON CONFLICT (bronze_table, listing_id) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash,
+            active = EXCLUDED.active,
+            updated_at = CURRENT_TIMESTAMP
+    """, [(table_name, key, content_hash, change_type != DELISTED) for key, change_type, content_hash in events])
@@ -1,11 +1,38 @@
+import os
+
 # PostgreSQL Database Config
 POSTGRES = {
-    "host": "localhost",
-    "port": 5432,
-    "database": "zipco_realestate2",
-    "user": "postgres",
-    "password": "sunset99NEW"
+    "host": os.getenv("POSTGRES_HOST", "localhost"),
+    "port": int(os.getenv("POSTGRES_PORT", "5432")),
+    "database": os.getenv("POSTGRES_DB", "zipco_realestate2"),
+    "user": os.getenv("POSTGRES_USER", "postgres"),
+    "password": os.getenv("POSTGRES_PASSWORD", "sunset99NEW")
 }
 # RentCast API Config
-API_KEY = "84110f0af5374f02b6abc1f33d8df1da"
-BASE_URL = "https://api.rentcast.io/v1/listings"
+API_KEY = os.getenv("RENTCAST_API_KEY", "84110f0af5374f02b6abc1f33d8df1da")
+# Point this at rentcast_simulator.py (e.g. http://127.0.0.1:8765/v1/listings) for local load tests
+BASE_URL = os.getenv("RENTCAST_BASE_URL", "https://api.rentcast.io/v1/listings")
+
+# Local RentCast response cache (see response_cache.py)
+# mode: "cache" = reuse fresh responses, "record" = always fetch and store,
+#       "replay" = never touch the network, "off" = no caching
+RESPONSE_CACHE = {
+    "mode": os.getenv("RENTCAST_CACHE_MODE", "cache"),
+    "dir": os.getenv("RENTCAST_CACHE_DIR", os.path.join(".cache", "rentcast")),
+    "ttl_seconds": int(os.getenv("RENTCAST_CACHE_TTL_SECONDS", str(12 * 3600))),
+    "max_bytes": int(os.getenv("RENTCAST_CACHE_MAX_MB", "512")) * 1024 * 1024,
+}
+
+# Optional Parquet copy of bronze/silver, partitioned by state and date (see parquet_store.py)
+PARQUET_LAKE = {
+    "enabled": os.getenv("ZIPCO_PARQUET_ENABLED", "0") == "1",
+    "dir": os.getenv("ZIPCO_PARQUET_DIR", os.path.join("data", "lake")),
+}
+
+# Bronze pagination: each (table, page) is one checkpointed unit (see etl_recovery.py).
+# One page of 50 per state matches the original request volume; raise max_pages to
+# walk further with limit/offset.
+BRONZE_PAGING = {
+    "page_size": int(os.getenv("RENTCAST_PAGE_SIZE", "50")),
+    "max_pages": int(os.getenv("RENTCAST_MAX_PAGES", "1")),
+}
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 
 # --- Database connection using SQLAlchemy ---
 def get_engine():
@@ -9,64 +9,96 @@ def get_engine():
 
 # --- Refresh Gold Tables ---
 def refresh_gold_tables():
+    from schema_manager import ensure_indexes
+
     engine = get_engine()
-    with engine.connect() as conn:
-        try:
-            # Refresh Gold Sales
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS gold_sales_listings AS
-                SELECT * FROM silver_sales WHERE 1=0;
-                TRUNCATE TABLE gold_sales_listings;
-                INSERT INTO gold_sales_listings
-                SELECT 
-                    id AS listing_id,
-                    address AS formatted_address,
-                    property_type,
-                    price,
-                    status,
-                    city,
-                    state,
-                    zip_code,
-                    bedrooms,
-                    bathrooms,
-                    sqft AS square_feet
-                FROM silver_sales;
-            """))
-
-            # Refresh Gold Rentals
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS gold_rental_listings AS
-                SELECT * FROM silver_rentals WHERE 1=0;
-                TRUNCATE TABLE gold_rental_listings;
-                INSERT INTO gold_rental_listings
-                SELECT 
-                    id AS listing_id,
-                    address AS formatted_address,
-                    property_type,
-                    price,
-                    status,
-                    city,
-                    state,
-                    zip_code,
-                    bedrooms,
-                    bathrooms,
-                    sqft AS square_feet
-                FROM silver_rentals;
-            """))
-
-            st.success("✅ Gold tables refreshed successfully!")
-        except Exception as e:
-            st.error(f"Error refreshing gold tables: {e}")
-
-# --- Load data safely ---
-@st.cache_data
-def load_data(table_name: str):
-    engine = get_engine()
+    conn = engine.raw_connection()
     try:
-        df = pd.read_sql_table(table_name, con=engine)
-        return df
+        with conn.cursor() as cur:
+            for gold_table, silver_table in (("gold_sales_listings", "silver_sales"),
+                                             ("gold_rental_listings", "silver_rentals")):
+                # Rebuilt with the dashboard's column names; the filter indexes are recreated below
+                cur.execute(f"""
+                    DROP TABLE IF EXISTS {gold_table};
+                    CREATE TABLE {gold_table} AS
+                    SELECT 
+                        id AS listing_id,
+                        address AS formatted_address,
+                        property_type,
+                        price,
+                        status,
+                        city,
+                        state,
+                        zip_code,
+                        bedrooms,
+                        bathrooms,
+                        sqft AS square_feet
+                    FROM {silver_table};
+                """)
+        conn.commit()
+        ensure_indexes(conn)  # ix_gold_*_listings_filters serve load_listings
+        st.cache_data.clear()
+        st.success("✅ Gold tables refreshed successfully!")
+    except Exception as e:
+        st.error(f"Error refreshing gold tables: {e}")
+    finally:
+        conn.close()
+
+FILTER_COLUMNS = ("state", "city", "property_type", "status")
+
+def _query(sql, params=None):
+    conn = get_engine().raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
     except Exception:
         return pd.DataFrame()  # Return empty DataFrame if table is missing
+    finally:
+        conn.close()
+
+LISTINGS_SAMPLE = 5000  # rows for the scatter plot and table; every KPI comes from the sketches
+
+def _sketch_query(func, *args, **kwargs):
+    import quantile_sketches
+
+    conn = get_engine().raw_connection()
+    try:
+        return getattr(quantile_sketches, func)(conn, *args, **kwargs)
+    except Exception:
+        return None  # sketches not built yet
+    finally:
+        conn.close()
+
+# --- Filter choices: the groups present in the gold sketches ---
+@st.cache_data(ttl=300)
+def load_filter_options(kind: str):
+    return _sketch_query("filter_options", kind)
+
+# --- A sample of the listings matching the sidebar filters (ix_gold_*_listings_filters) ---
+@st.cache_data(ttl=300)
+def load_listings(table_name: str, states, cities, property_types, statuses, limit=LISTINGS_SAMPLE):
+    conditions, params = [], {"limit": limit}
+    for column, values in zip(FILTER_COLUMNS, (states, cities, property_types, statuses)):
+        if values:
+            conditions.append(f"{column} = ANY(%({column})s)")
+            params[column] = list(values)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return _query(f"SELECT * FROM {table_name} {where} LIMIT %(limit)s", params)
+
+# --- Price/sqft distributions from the gold sketches (no full-table read) ---
+@st.cache_data(ttl=300)
+def load_distribution(kind: str, metric: str, states, cities, property_types, statuses):
+    summary = _sketch_query("summarize", kind, metric, states=states, cities=cities,
+                            property_types=property_types, statuses=statuses)
+    return summary if summary and summary["listings"] else None
+
+# --- Average price per city, also from the sketches ---
+@st.cache_data(ttl=300)
+def load_breakdown(kind: str, column: str, states, cities, property_types, statuses):
+    rows = _sketch_query("breakdown", kind, column, states=states, cities=cities,
+                         property_types=property_types, statuses=statuses)
+    return pd.DataFrame(rows or [], columns=[column, "listings", "avg_price"])
 
 # --- Sidebar: Admin controls ---
 st.sidebar.header("⚡ Admin Controls")
@@ -78,52 +110,58 @@ st.sidebar.header("📂 Dataset")
 dataset_choice = st.sidebar.radio("Choose dataset:", ["Sales Listings", "Rental Listings"])
 table_name = "gold_sales_listings" if dataset_choice == "Sales Listings" else "gold_rental_listings"
 
-# --- Load selected data ---
-df = load_data(table_name)
-if df.empty:
-    st.warning(f"No data available for {dataset_choice}. Refresh gold tables or check silver tables.")
+kind = "sales" if dataset_choice == "Sales Listings" else "rentals"
+
+# --- Load filter choices for the selected data ---
+options = load_filter_options(kind)
+if not options or not options["state"]:
+    st.warning(f"No data available for {dataset_choice}. Run the gold stage (python quantile_sketches.py) "
+               "or check silver tables.")
     st.stop()
 
 # --- Sidebar: Filters ---
 st.sidebar.header("🔍 Filters")
-state_filter = st.sidebar.multiselect("State", sorted(df["state"].dropna().unique()))
-city_filter = st.sidebar.multiselect("City", sorted(df["city"].dropna().unique()))
-type_filter = st.sidebar.multiselect("Property Type", sorted(df["property_type"].dropna().unique()))
-status_filter = st.sidebar.multiselect("Status", sorted(df["status"].dropna().unique()))
-
-# --- Apply filters ---
-filtered_df = df.copy()
-if state_filter:
-    filtered_df = filtered_df[filtered_df["state"].isin(state_filter)]
-if city_filter:
-    filtered_df = filtered_df[filtered_df["city"].isin(city_filter)]
-if type_filter:
-    filtered_df = filtered_df[filtered_df["property_type"].isin(type_filter)]
-if status_filter:
-    filtered_df = filtered_df[filtered_df["status"].isin(status_filter)]
+state_filter = st.sidebar.multiselect("State", options["state"])
+city_filter = st.sidebar.multiselect("City", options["city"])
+type_filter = st.sidebar.multiselect("Property Type", options["property_type"])
+status_filter = st.sidebar.multiselect("Status", options["status"])
+
+# --- Apply filters in the database ---
+filters = (tuple(state_filter), tuple(city_filter), tuple(type_filter), tuple(status_filter))
+filtered_df = load_listings(table_name, *filters)
 
 # --- KPIs ---
 st.title(f"🏡 Zipco Real Estate Dashboard — {dataset_choice}")
 
-col1, col2, col3 = st.columns(3)
-col1.metric("Total Listings", len(filtered_df))
-col2.metric("Avg Price", f"${filtered_df['price'].mean():,.0f}" if not filtered_df.empty else "N/A")
-col3.metric("Median Sqft", f"{filtered_df['square_feet'].median():,.0f}" if not filtered_df.empty else "N/A")
+price_dist = load_distribution(kind, "price", *filters)
+sqft_dist = load_distribution(kind, "sqft", *filters)
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Priced Listings", f"{price_dist['listings']:,}" if price_dist else 0)
+col2.metric("Avg Price", f"${price_dist['mean']:,.0f}" if price_dist else "N/A")
+col3.metric("Median / P90 Price",
+            f"${price_dist['median']:,.0f} / ${price_dist['p90']:,.0f}" if price_dist else "N/A")
+col4.metric("Median Sqft", f"{sqft_dist['median']:,.0f}" if sqft_dist else "N/A")
 
 # --- Charts ---
 st.subheader("📊 Price Distribution")
-if not filtered_df.empty:
-    price_chart = alt.Chart(filtered_df).mark_bar().encode(
-        x=alt.X("price", bin=alt.Bin(maxbins=40), title="Price ($)"),
-        y="count()"
+if price_dist:
+    buckets = pd.DataFrame(price_dist["histogram"])
+    buckets["low"] = buckets["low"].fillna(0)
+    buckets["high"] = buckets["high"].fillna(buckets["low"] * 1.2)
+    price_chart = alt.Chart(buckets).mark_bar().encode(
+        x=alt.X("low", title="Price ($)"),
+        x2="high",
+        y=alt.Y("count", title="Listings")
     )
     st.altair_chart(price_chart, use_container_width=True)
 
 st.subheader("🏙️ Average Price by City")
-if not filtered_df.empty:
-    city_chart = alt.Chart(filtered_df).mark_bar().encode(
+city_df = load_breakdown(kind, "city", *filters)
+if not city_df.empty:
+    city_chart = alt.Chart(city_df).mark_bar().encode(
         x="city",
-        y="average(price)",
+        y=alt.Y("avg_price", title="average(price)"),
         color="city"
     )
     st.altair_chart(city_chart, use_container_width=True)
@@ -139,4 +177,6 @@ if not filtered_df.empty:
 
 # --- Raw data view ---
 st.subheader("📋 Detailed Listings")
+if len(filtered_df) == LISTINGS_SAMPLE:
+    st.caption(f"First {LISTINGS_SAMPLE:,} matching listings")
 st.dataframe(filtered_df)
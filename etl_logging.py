@@ -3,7 +3,6 @@ from logging.handlers import RotatingFileHandler
 import os, socket
 
 DEFAULT_LOG_PATH = os.getenv("ETL_LOG_PATH", "logs/etl_pipeline.log")
-os.makedirs(os.path.dirname(DEFAULT_LOG_PATH), exist_ok=True)
 
 def setup_logging(name: str = "etl", level: int = logging.INFO) -> logging.Logger:
     logger = logging.getLogger(name)
@@ -24,6 +23,8 @@ def setup_logging(name: str = "etl", level: int = logging.INFO) -> logging.Logge
 
     logger.addFilter(HostFilter())
 
+    # directory is created here rather than at import, so importing this module has no side effects
+    os.makedirs(os.path.dirname(DEFAULT_LOG_PATH), exist_ok=True)
     file_handler = RotatingFileHandler(DEFAULT_LOG_PATH, maxBytes=10_000_000, backupCount=5)
     file_handler.setFormatter(fmt)
 
@@ -36,10 +37,10 @@ def setup_logging(name: str = "etl", level: int = logging.INFO) -> logging.Logge
 
 def timed(task_name: str):
     import time, functools
-    log = setup_logging()
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            log = setup_logging()  # on first call, not when the decorated module is imported
             start = time.time()
             log.info(f"{task_name} started")
             try:
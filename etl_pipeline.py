@@ -2,11 +2,17 @@
 import subprocess
 import datetime
 
-print(f"ETL run started: {datetime.datetime.now()}")
 
-# Run your Bronze -> Silver -> Gold logic
-# Example: call your API and save JSON
-# transform and save parquet/Delta
-# etc.
+def main():
+    print(f"ETL run started: {datetime.datetime.now()}")
 
-print("ETL process completed successfully.")
+    # Run your Bronze -> Silver -> Gold logic
+    # Example: call your API and save JSON
+    # transform and save parquet/Delta
+    # etc.
+
+    print("ETL process completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
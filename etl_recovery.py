@@ -0,0 +1,223 @@
+# etl_recovery.py
+# Checkpoints and a dead-letter queue for bronze and silver, so one bad state or record
+# doesn't mean re-running the whole stage.
+#
+# Every unit of work, (stage, table, page), gets a row in etl_checkpoints for the run:
+# "done" or "failed". Failed API requests and records that can't be parsed or stored go to
+# etl_dead_letters with the payload and error. The rest of the run carries on.
+#
+#   python etl_recovery.py status [--run-id ID]   # units and open dead letters per run
+#   python etl_recovery.py resume [--run-id ID]   # retry only the failed units
+#
+# Processes that share ZIPCO_RUN_ID (e.g. the bronze/silver/gold tasks of one DAG run)
+# record into the same run.
+import argparse
+import json
+import os
+from datetime import datetime
+
+DONE, FAILED = "done", "failed"
+
+_run_id = None
+
+
+def current_run_id():
+    """ZIPCO_RUN_ID if set, otherwise one id per process."""
+    global _run_id
+    if _run_id is None:
+        _run_id = os.getenv("ZIPCO_RUN_ID") or f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+    return _run_id
+
+
+def create_recovery_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS etl_checkpoints (
+            run_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            page INT NOT NULL DEFAULT 0,
+            state TEXT,
+            status TEXT NOT NULL,
+            records INT,
+            attempts INT NOT NULL DEFAULT 1,
+            error TEXT,
+            request JSONB,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, stage, table_name, page)
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS etl_dead_letters (
+            id SERIAL PRIMARY KEY,
+            run_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            page INT NOT NULL DEFAULT 0,
+            record_key TEXT,
+            payload JSONB,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            resolved_at TIMESTAMP
+        );
+        """)
+    conn.commit()
+
+
+def checkpoint(cur, run_id, stage, table_name, page, status, state=None, records=None, error=None,
+               request=None):
+    """Record a unit's outcome; runs on the caller's cursor so it commits with the unit's data."""
+    cur.execute("""
+        INSERT INTO etl_checkpoints (run_id, stage, table_name, page, state, status, records, error, request)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (run_id, stage, table_name, page) DO UPDATE SET
+            status = EXCLUDED.status, records = EXCLUDED.records, error = EXCLUDED.error,
+            request = COALESCE(EXCLUDED.request, etl_checkpoints.request),
+            attempts = etl_checkpoints.attempts + 1, updated_at = CURRENT_TIMESTAMP
+    """, [run_id, stage, table_name, page, state, status, records, error and str(error)[:2000],
+          json.dumps(request) if request is not None else None])
+    if status == DONE:
+        # the failed request this unit dead-lettered earlier has now gone through
+        cur.execute("""
+            UPDATE etl_dead_letters SET resolved_at = CURRENT_TIMESTAMP
+            WHERE run_id = %s AND stage = %s AND table_name = %s AND page = %s
+              AND record_key IS NULL AND resolved_at IS NULL
+        """, [run_id, stage, table_name, page])
+
+
+def dead_letter(cur, run_id, stage, table_name, payload, error, page=0, record_key=None):
+    """Park a failed request (record_key None) or a bad record for inspection."""
+    dead_letters(cur, run_id, stage, table_name, [(record_key, payload, error)], page)
+
+
+def dead_letters(cur, run_id, stage, table_name, letters, page=0):
+    """letters: (record_key, payload, error) tuples."""
+    from psycopg2.extras import execute_values
+    if not letters:
+        return
+    execute_values(cur, """
+        INSERT INTO etl_dead_letters (run_id, stage, table_name, page, record_key, payload, error) VALUES %s
+    """, [(run_id, stage, table_name, page, None if key is None else str(key),
+           json.dumps(payload, default=str), str(error)[:2000]) for key, payload, error in letters])
+
+
+def completed_units(conn, run_id, stage):
+    """{(table_name, page): records} for the units of this run that are done."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT table_name, page, records FROM etl_checkpoints
+            WHERE run_id = %s AND stage = %s AND status = %s
+        """, [run_id, stage, DONE])
+        return {(table_name, page): records for table_name, page, records in cur.fetchall()}
+
+
+def insert_with_fallback(cur, query, items, on_error, template=None, as_row=tuple):
+    """execute_values the whole batch; if that fails, retry row by row and hand each bad item
+    and its exception to `on_error` instead of losing the batch. Returns rows stored.
+
+    Rows are built from `items` (a sized collection) with `as_row` as execute_values pages
+    through them, so the batch never exists as a second full list of tuples.
+    """
+    from psycopg2.extras import execute_values
+    cur.execute("SAVEPOINT etl_batch")
+    try:
+        execute_values(cur, query, (as_row(item) for item in items), template=template)
+        cur.execute("RELEASE SAVEPOINT etl_batch")
+        return len(items)
+    except Exception:
+        cur.execute("ROLLBACK TO SAVEPOINT etl_batch")
+
+    stored = 0
+    for item in items:
+        cur.execute("SAVEPOINT etl_row")
+        try:
+            execute_values(cur, query, [as_row(item)], template=template)
+            cur.execute("RELEASE SAVEPOINT etl_row")
+            stored += 1
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT etl_row")
+            on_error(item, e)
+    return stored
+
+
+def latest_run(conn, with_failures=False):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT run_id FROM etl_checkpoints
+            {"WHERE status = 'failed'" if with_failures else ""}
+            GROUP BY run_id ORDER BY MAX(updated_at) DESC LIMIT 1
+        """)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def failed_units(conn, run_id):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT stage, table_name, page, state, request, attempts, error FROM etl_checkpoints
+            WHERE run_id = %s AND status = %s
+            ORDER BY stage, table_name, page
+        """, [run_id, FAILED])
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def resume(conn, run_id):
+    """Retry the failed units of `run_id`: bronze pages are refetched and stored, silver
+    tables re-read from their watermark. Returns (retried, still failing)."""
+    import bronze_ingest
+    import silver_transform
+
+    units = failed_units(conn, run_id)
+    failing = 0
+    for unit in units:
+        if unit["stage"] == "bronze":
+            request = unit["request"] or {}
+            ok = bronze_ingest.ingest_unit(unit["table_name"], unit["state"], unit["page"],
+                                           request.get("endpoint"), request.get("params"), run_id) is not None
+        else:
+            ok = silver_transform.transform_unit(conn, unit["table_name"], run_id) is not None
+        failing += not ok
+        print(f"{unit['stage']} {unit['table_name']} page {unit['page']}: {'done' if ok else 'failed again'}")
+    return len(units), failing
+
+
+def status(conn, run_id):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT stage, status, COUNT(*), COALESCE(SUM(records), 0) FROM etl_checkpoints
+            WHERE run_id = %s GROUP BY stage, status ORDER BY stage, status
+        """, [run_id])
+        units = cur.fetchall()
+        cur.execute("""
+            SELECT stage, table_name, COUNT(*), MIN(error) FROM etl_dead_letters
+            WHERE run_id = %s AND resolved_at IS NULL GROUP BY stage, table_name ORDER BY stage, table_name
+        """, [run_id])
+        letters = cur.fetchall()
+    print(f"Run {run_id}")
+    for stage, unit_status, count, records in units:
+        print(f"  {stage:<8}{unit_status:<8}{count:>6} unit(s){records:>10} record(s)")
+    for stage, table_name, count, error in letters:
+        print(f"  dead letters {stage} {table_name}: {count} (e.g. {error.splitlines()[0][:100]})")
+
+
+if __name__ == "__main__":
+    from config import POSTGRES
+    from utils import get_db_connection
+
+    parser = argparse.ArgumentParser(description="Checkpoint status and resume for bronze/silver runs")
+    parser.add_argument("command", choices=["status", "resume"])
+    parser.add_argument("--run-id", help="default: the latest run (with failures, for resume)")
+    args = parser.parse_args()
+
+    conn = get_db_connection(POSTGRES)
+    create_recovery_tables(conn)
+    run_id = args.run_id or latest_run(conn, with_failures=args.command == "resume")
+    if run_id is None:
+        print("No runs to " + ("resume" if args.command == "resume" else "report"))
+    elif args.command == "status":
+        status(conn, run_id)
+    else:
+        retried, failing = resume(conn, run_id)
+        print(f"Retried {retried} unit(s) of run {run_id}; {failing} still failing")
+    conn.close()
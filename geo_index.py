@@ -0,0 +1,244 @@
+# geo_index.py
+# Geohash grid over silver listings: cell encoding in pure Python, per-cell gold rollups
+# and fast "comparables within N miles" lookups that only touch the few cells covering the
+# query circle instead of scanning every listing.
+import math
+from datetime import datetime
+
+GEOHASH_PRECISION = 8          # stored on silver rows (~38m x 19m cells)
+ROLLUP_PRECISIONS = (4, 5, 6)  # ~24mi, ~3mi and ~0.7mi wide cells in gold_geo_cells
+MAX_COVER_CELLS = 64           # prefix scans per comparables lookup
+EARTH_RADIUS_MILES = 3958.8
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            value = (value << 1) | (lon >= mid)
+            lon_lo, lon_hi = (mid, lon_hi) if lon >= mid else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = (value << 1) | (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def bounds(cell):
+    """(lat_lo, lat_hi, lon_lo, lon_hi) of a geohash cell."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for char in cell:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lon_lo, lon_hi
+
+
+def center(cell):
+    lat_lo, lat_hi, lon_lo, lon_hi = bounds(cell)
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+
+
+def neighbors(cell):
+    """The cell plus its 8 neighbours (fewer at the poles)."""
+    lat_lo, lat_hi, lon_lo, lon_hi = bounds(cell)
+    lat, lon = (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+    height, width = lat_hi - lat_lo, lon_hi - lon_lo
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlon in (-1, 0, 1):
+            n_lat = lat + dlat * height
+            if not -90 < n_lat < 90:
+                continue
+            n_lon = (lon + dlon * width + 180) % 360 - 180
+            cells.append(encode(n_lat, n_lon, len(cell)))
+    return list(dict.fromkeys(cells))
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlmb = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def cell_size_miles(precision, lat):
+    """(height, width) of a cell at this latitude."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lon_bits
+    height = 180 / 2 ** lat_bits * 69.05
+    width = 360 / 2 ** lon_bits * 69.17 * math.cos(math.radians(lat))
+    return height, width
+
+
+def _bbox(lat, lon, radius_miles):
+    """(lat_lo, lat_hi, lon_lo, lon_hi) of the square around the circle; the longitude span
+    may run past +-180, which the callers wrap."""
+    dlat = radius_miles / 69.05
+    dlon = radius_miles / (69.17 * max(math.cos(math.radians(lat)), 0.01))
+    return max(lat - dlat, -90.0), min(lat + dlat, 90.0), lon - dlon, lon + dlon
+
+
+def covering_cells(lat, lon, radius_miles, max_cells=MAX_COVER_CELLS):
+    """Cells of the finest precision whose grid covers the circle's bounding box in at most
+    `max_cells` cells, so the prefix scans read little more than the box itself."""
+    lat_lo, lat_hi, lon_lo, lon_hi = _bbox(lat, lon, radius_miles)
+    lon_hi = min(lon_hi, lon_lo + 360)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lon_bits = math.ceil(5 * precision / 2)
+        lat_deg, lon_deg = 180 / 2 ** (5 * precision - lon_bits), 360 / 2 ** lon_bits
+        first_row, first_col = math.floor((lat_lo + 90) / lat_deg), math.floor((lon_lo + 180) / lon_deg)
+        rows = min(math.floor((lat_hi + 90) / lat_deg), 2 ** (5 * precision - lon_bits) - 1) - first_row + 1
+        cols = math.floor((lon_hi + 180) / lon_deg) - first_col + 1
+        if rows * cols <= max_cells or precision == 1:
+            break
+    cells = []
+    for row in range(first_row, first_row + rows):
+        cell_lat = (row + 0.5) * lat_deg - 90
+        for col in range(first_col, first_col + cols):
+            cell_lon = ((col + 0.5) * lon_deg) % 360 - 180
+            cells.append(encode(cell_lat, cell_lon, precision))
+    return list(dict.fromkeys(cells))
+
+
+_DISTANCE_SQL = f"""
+    2 * {EARTH_RADIUS_MILES} * asin(least(1, sqrt(
+        power(sin(radians(latitude - %(lat)s) / 2), 2)
+        + cos(radians(%(lat)s)) * cos(radians(latitude)) * power(sin(radians(longitude - %(lon)s) / 2), 2)
+    )))
+"""
+
+
+def comparable_listings(conn, lat, lon, radius_miles=1.0, kind="sales", limit=20,
+                        property_type=None, bedrooms=None):
+    """Listings within `radius_miles`, nearest first, as dicts with a `distance_miles` key.
+
+    Candidates come from prefix range scans on the geohash index for the few cells covering
+    the circle's bounding box, are cut to the box itself, and Postgres does the exact
+    distance check, the ordering and the limit, so only `limit` rows come back.
+    """
+    table = "silver_rentals" if kind == "rentals" else "silver_sales"
+    cells = covering_cells(lat, lon, radius_miles)
+    lat_lo, lat_hi, lon_lo, lon_hi = _bbox(lat, lon, radius_miles)
+    params = {"lat": lat, "lon": lon, "radius": radius_miles, "limit": limit,
+              "lat_lo": lat_lo, "lat_hi": lat_hi, "lon_lo": lon_lo, "lon_hi": lon_hi}
+    prefix_clauses = []
+    for i, cell in enumerate(cells):
+        prefix_clauses.append(f"geohash LIKE %(cell{i})s")
+        params[f"cell{i}"] = f"{cell}%"
+    filters = " AND latitude BETWEEN %(lat_lo)s AND %(lat_hi)s"
+    if -180 <= lon_lo and lon_hi <= 180:  # a box across the antimeridian relies on the cells alone
+        filters += " AND longitude BETWEEN %(lon_lo)s AND %(lon_hi)s"
+    if property_type:
+        filters += " AND property_type = %(property_type)s"
+        params["property_type"] = property_type
+    if bedrooms is not None:
+        filters += " AND bedrooms = %(bedrooms)s"
+        params["bedrooms"] = bedrooms
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT listing_id, address, city, state, zip_code, price, bedrooms, bathrooms, sqft,
+                   property_type, latitude, longitude, round(distance::numeric, 3)::float AS distance_miles
+            FROM (
+                SELECT *, {_DISTANCE_SQL} AS distance
+                FROM {table}
+                WHERE ({" OR ".join(prefix_clauses)}){filters}
+            ) candidates
+            WHERE distance <= %(radius)s
+            ORDER BY distance
+            LIMIT %(limit)s
+        """, params)
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def cell_yields(conn, lat, lon, precision=5, ring=True):
+    """Gold rollups for the cell containing the point (and its neighbours when `ring`)."""
+    cell = encode(lat, lon, precision)
+    cells = neighbors(cell) if ring else [cell]
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT cell, sales_listings, median_sale_price, rental_listings, median_rent, gross_yield
+            FROM gold_geo_cells WHERE cell = ANY(%s)
+            ORDER BY cell
+        """, [cells])
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def create_geo_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold_geo_cells (
+            cell TEXT PRIMARY KEY,
+            precision INT,
+            center_lat DOUBLE PRECISION,
+            center_lon DOUBLE PRECISION,
+            sales_listings INT,
+            avg_sale_price NUMERIC,
+            median_sale_price NUMERIC,
+            rental_listings INT,
+            avg_rent NUMERIC,
+            median_rent NUMERIC,
+            gross_yield NUMERIC,
+            updated_at TIMESTAMP
+        );
+        """)
+    conn.commit()
+
+
+def aggregate_geo_cells(conn):
+    """Rebuild gold_geo_cells: price/rent rollups per cell at each ROLLUP_PRECISIONS level."""
+    from psycopg2.extras import execute_values
+    rollup = """
+        SELECT LEFT(geohash, %(p)s) AS cell, COUNT(*), AVG(price),
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY price)
+        FROM {table}
+        WHERE geohash IS NOT NULL AND price IS NOT NULL AND status IS DISTINCT FROM 'Inactive'
+        GROUP BY 1
+    """
+    cells = {}
+    now = datetime.now()
+    with conn.cursor() as cur:
+        for precision in ROLLUP_PRECISIONS:
+            for table, offset in (("silver_sales", 0), ("silver_rentals", 3)):
+                cur.execute(rollup.format(table=table), {"p": precision})
+                for cell, count, avg, median in cur.fetchall():
+                    entry = cells.setdefault(cell, [0, None, None, 0, None, None])
+                    entry[offset:offset + 3] = [count, avg, median]
+
+        rows = []
+        for cell, (sales, avg_sale, median_sale, rentals, avg_rent, median_rent) in cells.items():
+            gross_yield = median_rent * 12 / median_sale if median_sale and median_rent else None
+            lat, lon = center(cell)
+            rows.append((cell, len(cell), lat, lon, sales, avg_sale, median_sale,
+                         rentals, avg_rent, median_rent, gross_yield, now))
+
+        cur.execute("DELETE FROM gold_geo_cells;")
+        if rows:
+            execute_values(cur, """
+            INSERT INTO gold_geo_cells
+            (cell, precision, center_lat, center_lon, sales_listings, avg_sale_price, median_sale_price,
+             rental_listings, avg_rent, median_rent, gross_yield, updated_at)
+            VALUES %s
+            """, rows)
+    conn.commit()
+    return len(rows)
@@ -1,7 +1,9 @@
-import psycopg2
-from psycopg2.extras import execute_values
-from config import POSTGRES
+from config import PARQUET_LAKE, POSTGRES
 from utils import get_db_connection
+from schema_manager import ensure_indexes
+from geo_index import aggregate_geo_cells, create_geo_tables
+from quantile_sketches import run_sketches
+from yield_match import run_yield
 
 def create_gold_tables(conn):
     with conn.cursor() as cur:
@@ -31,6 +33,7 @@ def create_gold_tables(conn):
     conn.commit()
 
 def aggregate_to_gold(conn):
+    from psycopg2.extras import execute_values
     with conn.cursor() as cur:
         # Clear existing data (optional – ensures fresh loads)
         cur.execute("DELETE FROM gold_sales_summary;")
@@ -46,7 +49,7 @@ def aggregate_to_gold(conn):
             AVG(bathrooms) AS avg_bathrooms,
             AVG(sqft) AS avg_sqft
         FROM silver_sales
-        WHERE price IS NOT NULL
+        WHERE price IS NOT NULL AND status IS DISTINCT FROM 'Inactive'  -- delisted listings stay in silver
         GROUP BY state;
         """)
         sales_summary = cur.fetchall()
@@ -68,7 +71,7 @@ def aggregate_to_gold(conn):
             AVG(bathrooms) AS avg_bathrooms,
             AVG(sqft) AS avg_sqft
         FROM silver_rentals
-        WHERE price IS NOT NULL
+        WHERE price IS NOT NULL AND status IS DISTINCT FROM 'Inactive'
         GROUP BY state;
         """)
         rentals_summary = cur.fetchall()
@@ -82,10 +85,42 @@ def aggregate_to_gold(conn):
         
     conn.commit()
 
+def aggregate_parquet_to_gold(conn):
+    """Same summaries as aggregate_to_gold, computed from the Parquet silver snapshots."""
+    from psycopg2.extras import execute_values
+    import parquet_store  # needs pyarrow
+
+    for kind in ("sales", "rentals"):
+        parquet_store.compact("silver", kind)  # one file per partition instead of one per unit
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM gold_sales_summary;")
+        cur.execute("DELETE FROM gold_rentals_summary;")
+        for kind in ("sales", "rentals"):
+            summary = parquet_store.summarize_silver(kind)
+            if summary:
+                execute_values(cur, f"""
+                INSERT INTO gold_{kind}_summary 
+                (state, total_listings, avg_price, avg_bedrooms, avg_bathrooms, avg_sqft)
+                VALUES %s
+                """, summary)
+    conn.commit()
+
+def load_gold(conn):
+    """Every gold step on one connection: state summaries, geo cells, sketches and yields."""
+    create_gold_tables(conn)
+    create_geo_tables(conn)
+    ensure_indexes(conn)
+    if PARQUET_LAKE["enabled"]:
+        aggregate_parquet_to_gold(conn)
+    else:
+        aggregate_to_gold(conn)
+    aggregate_geo_cells(conn)
+    run_sketches(conn)
+    run_yield(conn)
+
 def run_gold():
     conn = get_db_connection(POSTGRES)
-    create_gold_tables(conn)
-    aggregate_to_gold(conn)
+    load_gold(conn)
     conn.close()
     print("Gold aggregation complete!")
 
@@ -93,14 +128,19 @@ if __name__ == "__main__":
     run_gold()
 
 #To handle Logging & Error Handling issues at the Gold Layer
-import pandas as pd
-from config import POSTGRES
+from config import PARQUET_LAKE, POSTGRES
 from utils import get_db_connection, create_table_if_not_exists
 from logging_config import logger
 
 def load_silver(table_name):
     """Load Silver table into DataFrame"""
+    import pandas as pd  # only the DataFrame path needs it; keeps startup cheap
     try:
+        if PARQUET_LAKE["enabled"]:
+            import parquet_store
+            df = parquet_store.latest_silver(table_name.split("_")[1]).to_pandas()
+            logger.info(f"Loaded {len(df)} rows from Parquet snapshots of {table_name}")
+            return df
         conn = get_db_connection(POSTGRES)
         df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
         conn.close()
@@ -112,6 +152,7 @@ def load_silver(table_name):
 
 def aggregate_sales(df):
     """Aggregate sales by propertyType"""
+    import pandas as pd
     try:
         agg_df = (
             df.groupby("propertyType")
@@ -127,6 +168,7 @@ def aggregate_sales(df):
 
 def aggregate_rentals(df):
     """Aggregate rentals by propertyType"""
+    import pandas as pd
     try:
         agg_df = (
             df.groupby("propertyType")
@@ -0,0 +1,203 @@
+# load_test.py
+# Runs the full bronze -> silver -> gold pipeline against rentcast_simulator.py at a
+# multiple of today's volume and reports throughput and p50/p95/p99 per stage. Each stage
+# runs the same units as the pipeline: bronze_ingest.ingest_state per state (checkpointed
+# pages, change detection, delistings), silver_transform.transform_unit per bronze table
+# and gold_load.load_gold (summaries, geo cells, sketches, yields). The simulator runs in
+# its own process, so its CPU time doesn't count against bronze.
+#
+#   python load_test.py --database zipco_loadtest --scales 10 100 1000
+#
+# The target database is wiped between runs, so never point it at the real one.
+import argparse
+import json
+import math
+import time
+
+import psycopg2
+
+from config import BRONZE_PAGING, POSTGRES
+from rentcast_simulator import DEFAULT_LISTINGS_PER_STATE, MAX_PAGE_SIZE, serve_in_subprocess
+import bronze_ingest
+import response_cache
+import silver_transform
+import gold_load
+from bronze_ingest import US_STATES
+from etl_recovery import current_run_id
+from utils import get_db_connection
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile (pct in 0-100) of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(name, samples, rows, wall_seconds):
+    """samples are per-unit durations in seconds (one page, one table, ...)."""
+    return {
+        "stage": name,
+        "units": len(samples),
+        "rows": rows,
+        "wall_s": round(wall_seconds, 3),
+        "rows_per_s": round(rows / wall_seconds, 1) if wall_seconds and rows else None,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95) * 1000, 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99) * 1000, 2) if samples else None,
+    }
+
+
+def ensure_database(database):
+    """Create the disposable load-test database on the configured server if needed."""
+    admin = psycopg2.connect(**{**POSTGRES, "database": "postgres"})
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", [database])
+        if not cur.fetchone():
+            cur.execute(f'CREATE DATABASE "{database}"')
+    admin.close()
+
+
+def reset_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = 'public'
+              AND (table_name LIKE 'bronze\\_%' OR table_name LIKE 'silver\\_%'
+                   OR table_name LIKE 'gold\\_%' OR table_name LIKE 'etl\\_%')
+        """)
+        for (table,) in cur.fetchall():
+            cur.execute(f'DROP TABLE IF EXISTS "{table}" CASCADE')
+    conn.commit()
+
+
+def _silver_rows(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT (SELECT COUNT(*) FROM silver_sales) + (SELECT COUNT(*) FROM silver_rentals)")
+        return cur.fetchone()[0]
+
+
+def run_bronze_stage(conn, base_url, states, run_id):
+    """bronze_ingest.ingest_state per state and endpoint; one sample per state."""
+    samples, failed = [], 0
+    for kind in ("sales", "rentals"):
+        for state in states:
+            start = time.perf_counter()
+            failed += bronze_ingest.ingest_state(kind, state, run_id, base_url=base_url)
+            samples.append(time.perf_counter() - start)
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM bronze_listing_index WHERE active")
+        listings = cur.fetchone()[0]
+    return summarize("bronze.ingest", samples, listings, sum(samples)), failed
+
+
+def run_silver_stage(conn, run_id):
+    """silver_transform.transform_unit per bronze table, as run_silver does."""
+    silver_transform.create_silver_tables(conn)
+    samples, failed = [], 0
+    for table in silver_transform.bronze_state_tables(conn):
+        start = time.perf_counter()
+        failed += silver_transform.transform_unit(conn, table, run_id) is None
+        samples.append(time.perf_counter() - start)
+    return summarize("silver.transform", samples, _silver_rows(conn), sum(samples)), failed
+
+
+def run_gold_stage(conn, repeat):
+    """gold_load.load_gold: the first pass builds everything from silver, the repeats find
+    nothing new, so they are reported apart and without a row count."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        gold_load.load_gold(conn)
+        samples.append(time.perf_counter() - start)
+    stages = [summarize("gold.load", samples[:1], _silver_rows(conn), samples[0])]
+    if len(samples) > 1:
+        stages.append(summarize("gold.incremental", samples[1:], 0, sum(samples[1:])))
+    return stages
+
+
+def run_scale(scale, states, args):
+    per_state = DEFAULT_LISTINGS_PER_STATE * scale
+    # its own process, so bronze timings don't include the simulator's CPU time
+    simulator, base_url = serve_in_subprocess(
+        listings_per_state=per_state,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    # every page of a state, plus the short one that ends it
+    BRONZE_PAGING.update(page_size=args.page_size, max_pages=math.ceil(per_state / args.page_size) + 1)
+    run_id = f"{current_run_id()}-{scale}x"
+    conn = get_db_connection(POSTGRES)
+    try:
+        reset_tables(conn)
+        start = time.perf_counter()
+        bronze, bronze_failed = run_bronze_stage(conn, base_url, states, run_id)
+        silver, silver_failed = run_silver_stage(conn, run_id)
+        gold = run_gold_stage(conn, max(args.gold_repeat, 1))
+        total = time.perf_counter() - start
+    finally:
+        conn.close()
+        simulator.terminate()
+        simulator.wait()
+
+    expected = per_state * len(states) * 2
+    return {
+        "scale": scale,
+        "expected_rows": expected,
+        "missing_rows": expected - bronze["rows"],
+        "failed_units": bronze_failed + silver_failed,
+        "run_id": run_id,
+        "total_s": round(total, 3),
+        "stages": [bronze, silver, *gold],
+    }
+
+
+def print_report(result):
+    print(f"\n=== {result['scale']}x volume: {result['expected_rows']} listings expected, "
+          f"{result['missing_rows']} missing, {result['failed_units']} failed unit(s) "
+          f"(run {result['run_id']}), {result['total_s']}s end to end ===")
+    print(f"{'stage':<18}{'units':>7}{'rows':>10}{'wall s':>10}{'rows/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for s in result["stages"]:
+        print(f"{s['stage']:<18}{s['units']:>7}{s['rows']:>10}{s['wall_s']:>10}{str(s['rows_per_s']):>11}"
+              f"{str(s['p50_ms']):>10}{str(s['p95_ms']):>10}{str(s['p99_ms']):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load test against the RentCast simulator")
+    parser.add_argument("--database", default="zipco_loadtest",
+                        help="disposable database on the configured Postgres server (wiped per run)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000],
+                        help="multiples of today's volume (50 listings per state per endpoint)")
+    parser.add_argument("--states", nargs="+", default=US_STATES)
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--gold-repeat", type=int, default=5,
+                        help="gold runs per scale: one full build, then no-change incremental runs")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.database == POSTGRES["database"]:
+        parser.error("refusing to wipe the pipeline database; pass a disposable --database")
+    ensure_database(args.database)
+    response_cache.set_mode("off")  # every request must reach the simulator to be measured
+    POSTGRES["database"] = args.database  # shared dict, so the pipeline modules follow
+
+    results = []
+    for scale in args.scales:
+        result = run_scale(scale, [s.upper() for s in args.states], args)
+        print_report(result)
+        results.append(result)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -1,19 +1,47 @@
 # logging_config.py
+# Nothing happens at import time: the log directory, file and handlers are set up the
+# first time `logger` is used, so importing a stage module (or running --help) stays cheap.
 import logging
 import os
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure logs directory exists
-
 LOG_FILE = os.path.join(LOG_DIR, "etl_pipeline.log")
 
-logging.basicConfig(
-    level=logging.INFO,  # Can change to DEBUG for more details
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE),   # Logs to file
-        logging.StreamHandler()          # Logs to console
-    ]
-)
+_configured = False
+
+
+class _LogFileHandler(logging.FileHandler):
+    """FileHandler that creates the log directory when the file is first written."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)  # Ensure logs directory exists
+        return super()._open()
+
+
+def configure_logging():
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    logging.basicConfig(
+        level=logging.INFO,  # Can change to DEBUG for more details
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+        handlers=[
+            _LogFileHandler(LOG_FILE, delay=True),   # Logs to file
+            logging.StreamHandler()                  # Logs to console
+        ]
+    )
+
+
+class _LazyLogger(logging.LoggerAdapter):
+    """The ETL-Pipeline logger, configuring logging on its first call."""
+
+    def log(self, level, msg, *args, **kwargs):
+        configure_logging()
+        super().log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
 
-logger = logging.getLogger("ETL-Pipeline")
+logger = _LazyLogger(logging.getLogger("ETL-Pipeline"), {})
@@ -4,7 +4,6 @@ from logging.handlers import RotatingFileHandler
 from datetime import datetime
 
 DEFAULT_LOG_PATH = os.getenv("ETL_LOG_PATH", "logs/etl_pipeline.log")
-os.makedirs(os.path.dirname(DEFAULT_LOG_PATH), exist_ok=True)
 
 def setup_logging(name: str = "etl", level: int = logging.INFO) -> logging.Logger:
     logger = logging.getLogger(name)
@@ -25,6 +24,8 @@ def setup_logging(name: str = "etl", level: int = logging.INFO) -> logging.Logge
     logger.addFilter(HostFilter())
 
     # File (rotating) + Console
+    # created on first setup rather than at import
+    os.makedirs(os.path.dirname(DEFAULT_LOG_PATH), exist_ok=True)
     file_handler = RotatingFileHandler(DEFAULT_LOG_PATH, maxBytes=10_000_000, backupCount=5)
     file_handler.setFormatter(fmt)
     console = logging.StreamHandler()
@@ -0,0 +1,272 @@
+# parquet_store.py
+# Optional file-based copy of bronze and silver as Parquet, partitioned by state and date:
+#
+#   data/lake/bronze/sales/state=TX/date=2026-10-19/part-<ts>.parquet
+#   data/lake/silver/rentals/state=CA/date=2026-10-19/part-<ts>.parquet
+#
+# Turned on with ZIPCO_PARQUET_ENABLED=1. Reads go through pyarrow datasets with a
+# memory-mapped filesystem, so only the projected columns of the matching partitions
+# are touched and nothing is pulled over the database connection. Every unit appends a
+# file per state, so compact() merges each partition's files into one; gold runs it on
+# silver before reading, and `--compact` runs it on demand.
+import argparse
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from config import PARQUET_LAKE
+
+SILVER_SALES_COLUMNS = [
+    "listing_id", "address", "city", "state", "zip_code", "price",
+    "bedrooms", "bathrooms", "sqft", "property_type", "status",
+    "latitude", "longitude", "geohash", "address_key", "zip5",
+]
+SILVER_RENTALS_COLUMNS = SILVER_SALES_COLUMNS + ["listed_date"]
+
+_SILVER_TYPES = {
+    "listing_id": pa.string(), "address": pa.string(), "city": pa.string(), "state": pa.string(),
+    "zip_code": pa.string(), "price": pa.float64(), "bedrooms": pa.int32(), "bathrooms": pa.float64(),
+    "sqft": pa.int32(), "property_type": pa.string(), "status": pa.string(),
+    "latitude": pa.float64(), "longitude": pa.float64(), "geohash": pa.string(),
+    "address_key": pa.int64(), "zip5": pa.int32(),
+    "listed_date": pa.timestamp("ms"),
+    "snapshot_ts": pa.timestamp("ms", tz="UTC"),
+}
+_BRONZE_SCHEMA = pa.schema([
+    ("listing_id", pa.string()),
+    ("city", pa.string()),
+    ("zip_code", pa.string()),
+    ("price", pa.float64()),
+    ("property_type", pa.string()),
+    ("raw_json", pa.string()),
+    ("snapshot_ts", pa.timestamp("ms", tz="UTC")),
+])
+# state/date live in the directory names, not in the files
+_PARTITIONING = ds.partitioning(pa.schema([("state", pa.string()), ("date", pa.string())]), flavor="hive")
+_MMAP_FS = fs.LocalFileSystem(use_mmap=True)
+
+
+def _kind(table_name):
+    """bronze_sales_tx / silver_rentals -> "sales" / "rentals"."""
+    return table_name.split("_")[1]
+
+
+def _partition_dir(layer, kind, state, snapshot_ts):
+    return os.path.join(PARQUET_LAKE["dir"], layer, kind, f"state={state or 'unknown'}",
+                        f"date={snapshot_ts:%Y-%m-%d}")
+
+
+def _write_partitions(layer, kind, by_state, schema, snapshot_ts):
+    written = 0
+    for state, columns in by_state.items():
+        table = pa.table(columns, schema=schema)
+        path = _partition_dir(layer, kind, state, snapshot_ts)
+        os.makedirs(path, exist_ok=True)
+        pq.write_table(table, os.path.join(path, f"part-{snapshot_ts:%H%M%S%f}.parquet"), compression="zstd")
+        written += table.num_rows
+    return written
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def write_bronze(table_name, records, snapshot_ts=None):
+    """Append raw listings for a bronze table as one Parquet file per state."""
+    snapshot_ts = snapshot_ts or datetime.now(timezone.utc)
+    by_state = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        if not record:
+            continue
+        columns = by_state[record.get("state")]
+        columns["listing_id"].append(record.get("id"))
+        columns["city"].append(record.get("city"))
+        columns["zip_code"].append(record.get("zipCode"))
+        columns["price"].append(_number(record.get("price")))
+        columns["property_type"].append(record.get("propertyType"))
+        columns["raw_json"].append(json.dumps(record))
+        columns["snapshot_ts"].append(snapshot_ts)
+    return _write_partitions("bronze", _kind(table_name), by_state, _BRONZE_SCHEMA, snapshot_ts)
+
+
+def write_silver(kind, rows, snapshot_ts=None):
+    """Append silver rows (lists in SILVER_*_COLUMNS order) as one Parquet file per state."""
+    snapshot_ts = snapshot_ts or datetime.now(timezone.utc)
+    names = SILVER_RENTALS_COLUMNS if kind == "rentals" else SILVER_SALES_COLUMNS
+    schema = pa.schema([(name, _SILVER_TYPES[name]) for name in names if name != "state"]
+                       + [("snapshot_ts", _SILVER_TYPES["snapshot_ts"])])
+    state_index = names.index("state")
+    by_state = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        columns = by_state[row[state_index]]
+        for name, value in zip(names, row):
+            if name == "state":
+                continue
+            if name in ("price", "bathrooms", "latitude", "longitude"):
+                value = _number(value)
+            elif name in ("address_key", "zip5"):
+                value = int(value) if value is not None else None
+            elif name in ("bedrooms", "sqft"):
+                value = _number(value)
+                value = int(value) if value is not None else None
+            elif name != "listed_date" and value is not None and not isinstance(value, str):
+                value = str(value)
+            columns[name].append(value)
+        columns["snapshot_ts"].append(snapshot_ts)
+    return _write_partitions("silver", kind, by_state, schema, snapshot_ts)
+
+
+def write_silver_records(kind, records, snapshot_ts=None):
+    """write_silver for silver_transform.ListingRecord objects. Their fields are already
+    coerced to the column types, so columns are read straight off the attributes."""
+    snapshot_ts = snapshot_ts or datetime.now(timezone.utc)
+    names = [name for name in (SILVER_RENTALS_COLUMNS if kind == "rentals" else SILVER_SALES_COLUMNS)
+             if name != "state"]
+    schema = pa.schema([(name, _SILVER_TYPES[name]) for name in names]
+                       + [("snapshot_ts", _SILVER_TYPES["snapshot_ts"])])
+    by_state = defaultdict(list)
+    for record in records:
+        by_state[record.state].append(record)
+    columns_by_state = {
+        state: {**{name: [getattr(record, name) for record in group] for name in names},
+                "snapshot_ts": [snapshot_ts] * len(group)}
+        for state, group in by_state.items()
+    }
+    return _write_partitions("silver", kind, columns_by_state, schema, snapshot_ts)
+
+
+def compact(layer, kind):
+    """Merge each partition's part files into one; returns how many files were merged away.
+
+    The merged file replaces the newest part before the others are removed, so a concurrent
+    reader may briefly see rows twice but never misses any.
+    """
+    root = os.path.join(PARQUET_LAKE["dir"], layer, kind)
+    merged = 0
+    for path, _, files in os.walk(root):
+        parts = sorted(name for name in files if name.startswith("part-") and name.endswith(".parquet"))
+        if len(parts) < 2:
+            continue
+        table = pa.concat_tables(pq.ParquetFile(os.path.join(path, name)).read() for name in parts)
+        tmp_path = os.path.join(path, f".{parts[-1]}.tmp")  # dot files are skipped by dataset discovery
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, os.path.join(path, parts[-1]))
+        for name in parts[:-1]:
+            os.remove(os.path.join(path, name))
+        merged += len(parts) - 1
+    return merged
+
+
+def dataset(layer, kind):
+    path = os.path.join(PARQUET_LAKE["dir"], layer, kind)
+    return ds.dataset(path, format="parquet", partitioning=_PARTITIONING, filesystem=_MMAP_FS)
+
+
+def build_filter(states=None, since=None, until=None):
+    """Partition predicate: states is a list of codes, since/until are YYYY-MM-DD strings."""
+    expression = None
+    for part in (
+        ds.field("state").isin(states) if states else None,
+        ds.field("date") >= since if since else None,
+        ds.field("date") <= until if until else None,
+    ):
+        if part is not None:
+            expression = part if expression is None else expression & part
+    return expression
+
+
+def scan(layer, kind, columns=None, states=None, since=None, until=None, filter=None):
+    """Column-projected, partition-pruned read; `filter` is an extra pyarrow expression."""
+    expression = build_filter(states, since, until)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    return dataset(layer, kind).to_table(columns=columns, filter=expression)
+
+
+def latest_silver(kind, columns=None, states=None):
+    """Silver snapshots are append-only; keep only each listing's newest version.
+
+    Rows without a listing_id (exported before silver was keyed) are skipped, like
+    silver itself drops them: the keyed transform re-exports those listings.
+    """
+    wanted = list(dict.fromkeys((columns or []) + ["listing_id", "snapshot_ts"])) if columns else None
+    table = scan("silver", kind, columns=wanted, states=states)
+    table = table.filter(pc.is_valid(table["listing_id"]))
+    newest = table.group_by("listing_id").aggregate([("snapshot_ts", "max")])
+    newest = newest.rename_columns(["snapshot_ts" if name == "snapshot_ts_max" else name
+                                    for name in newest.column_names])
+    return table.join(newest, keys=["listing_id", "snapshot_ts"], join_type="inner")
+
+
+def summarize_silver(kind):
+    """Rows shaped like gold_*_summary: (state, total_listings, avg_price, avg_bedrooms, avg_bathrooms, avg_sqft)."""
+    table = latest_silver(kind, columns=["state", "price", "bedrooms", "bathrooms", "sqft", "status"])
+    # a delisted listing's newest snapshot is its Inactive one
+    listed = pc.fill_null(pc.not_equal(table["status"], "Inactive"), True)
+    table = table.filter(pc.and_(pc.is_valid(table["price"]), listed))
+    summary = table.group_by("state").aggregate([
+        ("price", "count"), ("price", "mean"), ("bedrooms", "mean"), ("bathrooms", "mean"), ("sqft", "mean"),
+    ])
+    return [
+        (row["state"], row["price_count"], row["price_mean"], row["bedrooms_mean"],
+         row["bathrooms_mean"], row["sqft_mean"])
+        for row in summary.to_pylist()
+    ]
+
+
+def backfill_silver(conn, kind):
+    """Export the current silver table so the snapshots start complete when first enabled."""
+    import silver_transform
+
+    silver_transform.create_silver_tables(conn)  # runs the listing_id migration first
+    names = SILVER_RENTALS_COLUMNS if kind == "rentals" else SILVER_SALES_COLUMNS
+    with conn.cursor(name=f"backfill_{kind}") as cur:  # server-side cursor, streamed in batches
+        cur.execute(f"SELECT {', '.join(names)} FROM silver_{kind} WHERE listing_id IS NOT NULL")
+        written = 0
+        while True:
+            rows = cur.fetchmany(50_000)
+            if not rows:
+                break
+            written += write_silver(kind, rows)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ad-hoc reads from the Parquet bronze/silver snapshots")
+    parser.add_argument("layer", choices=["bronze", "silver"])
+    parser.add_argument("kind", choices=["sales", "rentals"])
+    parser.add_argument("--columns", nargs="+")
+    parser.add_argument("--state", nargs="+", dest="states")
+    parser.add_argument("--since", help="first partition date, YYYY-MM-DD")
+    parser.add_argument("--until", help="last partition date, YYYY-MM-DD")
+    parser.add_argument("--head", type=int, default=10)
+    parser.add_argument("--backfill", action="store_true",
+                        help="first copy the current Postgres silver table into the snapshots")
+    parser.add_argument("--compact", action="store_true", help="first merge each partition's files into one")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from config import POSTGRES
+        from utils import get_db_connection
+
+        if args.layer != "silver":
+            parser.error("--backfill only applies to the silver layer")
+        conn = get_db_connection(POSTGRES)
+        print(f"Backfilled {backfill_silver(conn, args.kind)} rows")
+        conn.close()
+    if args.compact:
+        print(f"Merged away {compact(args.layer, args.kind)} files")
+
+    result = scan(args.layer, args.kind, args.columns, args.states, args.since, args.until)
+    print(f"{result.num_rows} rows, {result.nbytes / 1e6:.1f} MB in memory")
+    print(result.slice(0, args.head).to_pandas().to_string())
@@ -0,0 +1,482 @@
+# quantile_sketches.py
+# Mergeable price/rent/sqft distributions kept in gold. Each (state, city, property type,
+# status) group stores a KLL quantile sketch and a fixed-bucket histogram per metric in
+# gold_price_sketches. Both merge by simple addition, so the dashboard can answer
+# "median and p90 rent in these cities" by combining a handful of rows, not by reading silver.
+#
+#   python quantile_sketches.py                 # fold new/changed silver rows into the sketches
+#   python quantile_sketches.py --rebuild       # recompute everything from silver
+#   python quantile_sketches.py --kind rentals --state TX --city Austin
+import argparse
+import bisect
+import json
+import math
+import random
+from datetime import datetime
+
+from utils import get_watermark, set_watermark
+
+KLL_K = 200  # ~1.3% normalised rank error on single quantiles
+METRICS = ("price", "sqft")
+GROUP_COLUMNS = ("state", "city", "property_type", "status")
+
+
+def _log_edges(low, high, buckets):
+    step = (math.log10(high) - math.log10(low)) / buckets
+    return [round(10 ** (math.log10(low) + i * step)) for i in range(buckets + 1)]
+
+
+# Shared bucket edges, so histograms from any two groups can be added together. 40 buckets
+# on a log scale, like the dashboard's 40-bin price chart; values outside land in the
+# first/last overflow bucket.
+HISTOGRAM_EDGES = {
+    ("sales", "price"): _log_edges(10_000, 10_000_000, 40),
+    ("rentals", "price"): _log_edges(250, 25_000, 40),
+    ("sales", "sqft"): _log_edges(200, 20_000, 40),
+    ("rentals", "sqft"): _log_edges(200, 20_000, 40),
+}
+
+_random = random.Random()
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Level h holds items that each stand for 2**h original values. When the sketch is full
+    the lowest overfull level is sorted and every other item (random offset) is promoted.
+    """
+
+    __slots__ = ("k", "levels", "n", "min", "max", "_room")
+
+    def __init__(self, k=KLL_K):
+        self.k = k
+        self.levels = [[]]
+        self.n = 0
+        self.min = None
+        self.max = None
+        self._room = self._max_size()  # updates left before the next compaction
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value):
+        value = float(value)
+        self.levels[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._room -= 1
+        if self._room <= 0:
+            self._compress()
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    break
+            else:
+                break
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items.sort()
+            keep = items.pop() if len(items) % 2 else None
+            self.levels[level + 1].extend(items[_random.randint(0, 1)::2])
+            self.levels[level] = [keep] if keep is not None else []
+        self._room = self._max_size() - self._size()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate value at rank q (0..1); None for an empty sketch."""
+        if not self.n:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        weighted = sorted((value, 2 ** level) for level, items in enumerate(self.levels) for value in items)
+        target = q * sum(weight for _, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return self.max
+
+    def to_json(self):
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_json(cls, data):
+        sketch = cls(data["k"])
+        sketch.n, sketch.min, sketch.max = data["n"], data["min"], data["max"]
+        sketch.levels = [list(items) for items in data["levels"]]
+        sketch._room = sketch._max_size() - sketch._size()
+        return sketch
+
+
+class Distribution:
+    """Sketch + histogram + sum (for the mean) for one metric of one group (or of several, once merged)."""
+
+    __slots__ = ("sketch", "histogram", "total")
+
+    def __init__(self, edges, sketch=None, histogram=None, total=0.0):
+        self.sketch = sketch or KLLSketch()
+        self.histogram = list(histogram) if histogram else [0] * (len(edges) + 1)
+        self.total = total or 0.0
+
+    def add(self, value, edges):
+        self.sketch.update(value)
+        self.histogram[bisect.bisect_right(edges, value)] += 1
+        self.total += value
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.total += other.total
+        return self
+
+
+def create_sketch_tables(conn):
+    with conn.cursor() as cur:
+        # Group columns use '' for missing values so they can be part of the key
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold_price_sketches (
+            kind TEXT NOT NULL,
+            state TEXT NOT NULL,
+            city TEXT NOT NULL,
+            property_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            listings BIGINT,
+            total DOUBLE PRECISION,
+            sketch JSONB,
+            histogram BIGINT[],
+            updated_at TIMESTAMP,
+            PRIMARY KEY (kind, state, city, property_type, status, metric)
+        );
+        """)
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'gold_price_sketches' AND column_name = 'total'
+        """)
+        if cur.fetchone() is None:
+            # sketches stored before the sum was kept: rebuild them on the next run
+            cur.execute("ALTER TABLE gold_price_sketches ADD COLUMN total DOUBLE PRECISION")
+            get_watermark(conn, "sketch:silver_sales")  # creates etl_watermarks if needed
+            cur.execute("DELETE FROM etl_watermarks WHERE name LIKE 'sketch:%'")
+        # Tracks which group each listing was last counted in, so an update can be
+        # taken out of its old group (sketches only support adding values)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold_sketch_members (
+            kind TEXT NOT NULL,
+            listing_id TEXT NOT NULL,
+            state TEXT NOT NULL,
+            city TEXT NOT NULL,
+            property_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (kind, listing_id)
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold_price_percentiles (
+            kind TEXT NOT NULL,
+            state TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            listings BIGINT,
+            p25 NUMERIC,
+            median NUMERIC,
+            p75 NUMERIC,
+            p90 NUMERIC,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (kind, state, metric)
+        );
+        """)
+    conn.commit()
+
+
+def _group(row):
+    return tuple(value or "" for value in row)
+
+
+def _add_rows(groups, kind, rows):
+    """rows: (state, city, property_type, status, price, sqft) tuples."""
+    for row in rows:
+        group = groups.setdefault(_group(row[:4]), {})
+        for metric, value in zip(METRICS, row[4:]):
+            if value is None:
+                continue
+            edges = HISTOGRAM_EDGES[(kind, metric)]
+            group.setdefault(metric, Distribution(edges)).add(float(value), edges)
+
+
+def _load_groups(cur, kind, keys):
+    groups = {key: {} for key in keys}
+    if not keys:
+        return groups
+    cur.execute("""
+        SELECT state, city, property_type, status, metric, sketch, histogram, total
+        FROM gold_price_sketches
+        WHERE kind = %s AND (state, city, property_type, status) IN (SELECT * FROM unnest(%s, %s, %s, %s))
+    """, [kind, *map(list, zip(*keys))])
+    for state, city, property_type, status, metric, sketch, histogram, total in cur.fetchall():
+        edges = HISTOGRAM_EDGES[(kind, metric)]
+        groups[(state, city, property_type, status)][metric] = Distribution(
+            edges, KLLSketch.from_json(sketch), histogram, total)
+    return groups
+
+
+def _save_groups(cur, kind, groups):
+    from psycopg2.extras import execute_values
+    now = datetime.now()
+    keys = list(groups)
+    if keys:
+        cur.execute("""
+            DELETE FROM gold_price_sketches
+            WHERE kind = %s AND (state, city, property_type, status) IN (SELECT * FROM unnest(%s, %s, %s, %s))
+        """, [kind, *map(list, zip(*keys))])
+    rows = [
+        (kind, *key, metric, dist.sketch.n, dist.total, json.dumps(dist.sketch.to_json()), dist.histogram, now)
+        for key, metrics in groups.items() for metric, dist in metrics.items()
+    ]
+    if rows:
+        execute_values(cur, """
+            INSERT INTO gold_price_sketches
+            (kind, state, city, property_type, status, metric, listings, total, sketch, histogram, updated_at)
+            VALUES %s
+        """, rows)
+
+
+def rebuild_sketches(conn, kind):
+    """Recompute every group of silver_<kind> from scratch.
+
+    Rows without a listing_id (stored before silver was keyed) are left out: they can't be
+    tracked in gold_sketch_members, and silver_transform replaces them with keyed copies.
+    """
+    from psycopg2.extras import execute_values
+    table = f"silver_{kind}"
+    groups, members = {}, []
+    with conn.cursor(name=f"sketch_{kind}") as cur:  # server-side cursor, streamed in batches
+        cur.execute(f"""
+            SELECT listing_id, state, city, property_type, status, price, sqft, version_seq FROM {table}
+            WHERE listing_id IS NOT NULL
+        """)
+        last_seq = 0
+        while True:
+            rows = cur.fetchmany(50_000)
+            if not rows:
+                break
+            _add_rows(groups, kind, [row[1:7] for row in rows])
+            members.extend((kind, row[0], *_group(row[1:5])) for row in rows)
+            last_seq = max(last_seq, max(row[7] or 0 for row in rows))
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM gold_price_sketches WHERE kind = %s", [kind])
+        cur.execute("DELETE FROM gold_sketch_members WHERE kind = %s", [kind])
+        _save_groups(cur, kind, groups)
+        if members:
+            execute_values(cur, """
+                INSERT INTO gold_sketch_members (kind, listing_id, state, city, property_type, status) VALUES %s
+            """, members)
+        set_watermark(cur, f"sketch:{table}", last_seq)
+    conn.commit()
+    return len(groups)
+
+
+def update_sketches(conn, kind):
+    """Fold silver rows inserted or updated since the last run into the sketches.
+
+    New listings are added to their group's sketch directly. A group that lost a listing
+    (price edit, status change, ...) is recomputed from silver, since a sketch can't
+    forget a value. Returns the number of groups written.
+    """
+    from psycopg2.extras import execute_values
+    table = f"silver_{kind}"
+    watermark = get_watermark(conn, f"sketch:{table}")
+    if not watermark:
+        return rebuild_sketches(conn, kind)
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT s.listing_id, s.state, s.city, s.property_type, s.status, s.price, s.sqft, s.version_seq,
+                   m.state, m.city, m.property_type, m.status
+            FROM {table} s
+            LEFT JOIN gold_sketch_members m ON m.kind = %s AND m.listing_id = s.listing_id
+            WHERE s.version_seq > %s AND s.listing_id IS NOT NULL
+        """, [kind, watermark])
+        rows = cur.fetchall()
+        if not rows:
+            return 0
+
+        dirty, added = set(), []
+        for row in rows:
+            if row[8] is not None:  # seen before: its old value is baked into the old group
+                dirty.add(_group(row[8:12]))
+                dirty.add(_group(row[1:5]))
+            else:
+                added.append(row)
+        added = [row for row in added if _group(row[1:5]) not in dirty]
+
+        groups = _load_groups(cur, kind, sorted({_group(row[1:5]) for row in added}))
+        _add_rows(groups, kind, [row[1:7] for row in added])
+        if dirty:
+            keys = sorted(dirty)
+            cur.execute(f"""
+                SELECT state, city, property_type, status, price, sqft FROM {table}
+                WHERE (COALESCE(state, ''), COALESCE(city, ''), COALESCE(property_type, ''), COALESCE(status, ''))
+                      IN (SELECT * FROM unnest(%s, %s, %s, %s))
+                  AND listing_id IS NOT NULL
+            """, list(map(list, zip(*keys))))
+            rebuilt = {key: {} for key in keys}  # groups left empty still get their old rows deleted
+            _add_rows(rebuilt, kind, cur.fetchall())
+            groups.update(rebuilt)
+        _save_groups(cur, kind, groups)
+
+        execute_values(cur, """
+            INSERT INTO gold_sketch_members (kind, listing_id, state, city, property_type, status) VALUES %s
+            ON CONFLICT (kind, listing_id) DO UPDATE SET
+                state = EXCLUDED.state, city = EXCLUDED.city,
+                property_type = EXCLUDED.property_type, status = EXCLUDED.status
+        """, [(kind, row[0], *_group(row[1:5])) for row in rows])
+        set_watermark(cur, f"sketch:{table}", max(row[7] for row in rows))
+    conn.commit()
+    return len(groups)
+
+
+def _where(kind, metric, states=None, cities=None, property_types=None, statuses=None):
+    filters, params = ["kind = %s", "metric = %s"], [kind, metric]
+    for column, values in zip(GROUP_COLUMNS, (states, cities, property_types, statuses)):
+        if values:
+            filters.append(f"{column} = ANY(%s)")
+            params.append(list(values))
+    return " AND ".join(filters), params
+
+
+def merged(conn, kind, metric="price", **filters):
+    """One Distribution for any combination of filters (None/empty means no filter)."""
+    where, params = _where(kind, metric, **filters)
+    edges = HISTOGRAM_EDGES[(kind, metric)]
+    result = Distribution(edges)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT sketch, histogram, total FROM gold_price_sketches WHERE {where}", params)
+        for sketch, histogram, total in cur.fetchall():
+            result.merge(Distribution(edges, KLLSketch.from_json(sketch), histogram, total))
+    return result
+
+
+def breakdown(conn, kind, column, metric="price", **filters):
+    """[(value, listings, mean)] per value of one group column, e.g. average price by city."""
+    if column not in GROUP_COLUMNS:
+        raise ValueError(f"Unknown group column {column!r}; expected one of {GROUP_COLUMNS}")
+    where, params = _where(kind, metric, **filters)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {column}, SUM(listings)::bigint, SUM(total) / NULLIF(SUM(listings), 0)
+            FROM gold_price_sketches WHERE {where}
+            GROUP BY {column} ORDER BY {column}
+        """, params)
+        return cur.fetchall()
+
+
+def filter_options(conn, kind):
+    """{group column: sorted values present in the sketches}, for filter pickers."""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT DISTINCT {', '.join(GROUP_COLUMNS)} FROM gold_price_sketches WHERE kind = %s", [kind])
+        rows = cur.fetchall()
+    return {column: sorted({row[i] for row in rows if row[i]}) for i, column in enumerate(GROUP_COLUMNS)}
+
+
+def summarize(conn, kind, metric="price", **filters):
+    """Count, mean, quartiles, p90 and histogram buckets for the filtered listings."""
+    dist = merged(conn, kind, metric, **filters)
+    edges = HISTOGRAM_EDGES[(kind, metric)]
+    lows = [None] + edges
+    highs = edges + [None]
+    return {
+        "listings": dist.sketch.n,
+        "mean": dist.total / dist.sketch.n if dist.sketch.n else None,
+        "min": dist.sketch.min,
+        "p25": dist.sketch.quantile(0.25),
+        "median": dist.sketch.quantile(0.5),
+        "p75": dist.sketch.quantile(0.75),
+        "p90": dist.sketch.quantile(0.9),
+        "max": dist.sketch.max,
+        "histogram": [
+            {"low": low, "high": high, "count": count}
+            for low, high, count in zip(lows, highs, dist.histogram) if count
+        ],
+    }
+
+
+def refresh_percentiles(conn, kind):
+    """Materialise per-state quartiles and p90 into gold_price_percentiles."""
+    from psycopg2.extras import execute_values
+    by_state = {}
+    with conn.cursor() as cur:
+        cur.execute("SELECT state, metric, sketch FROM gold_price_sketches WHERE kind = %s", [kind])
+        for state, metric, sketch in cur.fetchall():
+            by_state.setdefault((state, metric), KLLSketch()).merge(KLLSketch.from_json(sketch))
+
+        now = datetime.now()
+        rows = [
+            (kind, state, metric, sketch.n, sketch.quantile(0.25), sketch.quantile(0.5),
+             sketch.quantile(0.75), sketch.quantile(0.9), now)
+            for (state, metric), sketch in by_state.items()
+        ]
+        cur.execute("DELETE FROM gold_price_percentiles WHERE kind = %s", [kind])
+        if rows:
+            execute_values(cur, """
+                INSERT INTO gold_price_percentiles
+                (kind, state, metric, listings, p25, median, p75, p90, updated_at)
+                VALUES %s
+            """, rows)
+    conn.commit()
+    return len(rows)
+
+
+def run_sketches(conn, rebuild=False):
+    create_sketch_tables(conn)
+    for kind in ("sales", "rentals"):
+        groups = rebuild_sketches(conn, kind) if rebuild else update_sketches(conn, kind)
+        refresh_percentiles(conn, kind)
+        print(f"{kind}: {groups} sketch group(s) written")
+
+
+if __name__ == "__main__":
+    from config import POSTGRES
+    from utils import get_db_connection
+
+    parser = argparse.ArgumentParser(description="Maintain or query the gold price/rent distribution sketches")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every sketch from silver")
+    parser.add_argument("--kind", choices=["sales", "rentals"], help="print a merged summary instead of updating")
+    parser.add_argument("--metric", choices=METRICS, default="price")
+    parser.add_argument("--state", nargs="+", dest="states")
+    parser.add_argument("--city", nargs="+", dest="cities")
+    parser.add_argument("--property-type", nargs="+", dest="property_types")
+    parser.add_argument("--status", nargs="+", dest="statuses")
+    args = parser.parse_args()
+
+    conn = get_db_connection(POSTGRES)
+    if args.kind:
+        print(json.dumps(summarize(conn, args.kind, args.metric, states=args.states, cities=args.cities,
+                                   property_types=args.property_types, statuses=args.statuses),
+                         indent=2, default=float))
+    else:
+        run_sketches(conn, rebuild=args.rebuild)
+    conn.close()
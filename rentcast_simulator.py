@@ -0,0 +1,313 @@
+# rentcast_simulator.py
+# Local stand-in for the RentCast listings API so bronze/silver/gold changes can be
+# exercised without spending quota on the live, rate-limited service.
+#
+#   python rentcast_simulator.py --port 8765 --listings-per-state 500 --latency-ms 80 --rate-limit 20
+#   RENTCAST_BASE_URL=http://127.0.0.1:8765/v1/listings python bronze_ingest.py
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Today's bronze run pulls one 50-row page per state, so that is the 1x volume
+DEFAULT_LISTINGS_PER_STATE = 50
+MAX_PAGE_SIZE = 500  # same cap as the real API
+
+SIMULATOR_DEFAULTS = {
+    "listings_per_state": DEFAULT_LISTINGS_PER_STATE,
+    "latency_ms": 0.0,         # mean added latency per request
+    "latency_jitter_ms": 0.0,  # +/- uniform jitter around the mean
+    "error_rate": 0.0,         # fraction of requests answered with a 5xx
+    "rate_limit": 0.0,         # requests per second before 429s (0 = unlimited)
+    "churn_rate": 0.0,         # fraction of listings whose price moves per epoch
+    "epoch": 0,                # bump to simulate a later day's data
+    "seed": 42,
+}
+
+# (approx. latitude, longitude, 3-digit zip prefix) per state
+STATE_GEO = {
+    "AL": (32.8, -86.8, "350"), "AK": (61.2, -149.9, "995"), "AZ": (33.4, -112.0, "850"),
+    "AR": (34.7, -92.3, "716"), "CA": (34.1, -118.2, "900"), "CO": (39.7, -105.0, "800"),
+    "CT": (41.6, -72.7, "060"), "DE": (39.2, -75.5, "197"), "FL": (28.5, -81.4, "320"),
+    "GA": (33.7, -84.4, "300"), "HI": (21.3, -157.8, "967"), "ID": (43.6, -116.2, "832"),
+    "IL": (41.9, -87.6, "600"), "IN": (39.8, -86.2, "460"), "IA": (41.6, -93.6, "500"),
+    "KS": (38.5, -97.5, "660"), "KY": (38.2, -85.7, "400"), "LA": (30.0, -90.1, "700"),
+    "ME": (43.7, -70.3, "039"), "MD": (39.3, -76.6, "206"), "MA": (42.4, -71.1, "010"),
+    "MI": (42.3, -83.0, "480"), "MN": (45.0, -93.3, "550"), "MS": (32.3, -90.2, "386"),
+    "MO": (38.6, -90.2, "630"), "MT": (46.9, -110.4, "590"), "NE": (41.3, -96.0, "680"),
+    "NV": (36.2, -115.1, "889"), "NH": (43.0, -71.5, "030"), "NJ": (40.7, -74.2, "070"),
+    "NM": (35.1, -106.6, "870"), "NY": (40.7, -74.0, "100"), "NC": (35.2, -80.8, "270"),
+    "ND": (46.9, -96.8, "580"), "OH": (40.0, -83.0, "430"), "OK": (35.5, -97.5, "730"),
+    "OR": (45.5, -122.7, "970"), "PA": (40.0, -75.2, "150"), "RI": (41.8, -71.4, "028"),
+    "SC": (34.0, -81.0, "290"), "SD": (43.5, -96.7, "570"), "TN": (36.2, -86.8, "370"),
+    "TX": (30.3, -97.7, "750"), "UT": (40.8, -111.9, "840"), "VT": (44.5, -73.2, "050"),
+    "VA": (37.5, -77.4, "220"), "WA": (47.6, -122.3, "980"), "WV": (38.4, -81.6, "247"),
+    "WI": (43.0, -88.0, "530"), "WY": (41.1, -104.8, "820"),
+}
+
+CITY_NAMES = [
+    "Springfield", "Franklin", "Greenville", "Clinton", "Madison", "Georgetown",
+    "Salem", "Fairview", "Riverside", "Arlington", "Ashland", "Milton",
+]
+STREET_NAMES = [
+    "Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Washington", "Lake",
+    "Hill", "Park", "Sunset", "Ridge", "Meadow", "Highland", "Willow",
+]
+STREET_SUFFIXES = ["St", "Ave", "Dr", "Ln", "Rd", "Ct", "Blvd", "Way"]
+PROPERTY_TYPES = ["Single Family", "Condo", "Townhouse", "Multi-Family", "Manufactured", "Apartment"]
+OFFICE_NAMES = ["Keller Williams", "RE/MAX", "Coldwell Banker", "Compass", "Redfin", "eXp Realty"]
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery"]
+LAST_NAMES = ["Smith", "Johnson", "Garcia", "Nguyen", "Brown", "Davis", "Lopez", "Patel"]
+
+
+def _rng(*parts):
+    """Deterministic RNG so the same listing looks the same on every request."""
+    digest = hashlib.blake2b(":".join(str(p) for p in parts).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def _contact(rng, name, domain):
+    slug = name.lower().replace(" ", "").replace("/", "")
+    return {
+        "name": name,
+        "phone": f"{rng.randint(200, 989)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}",
+        "email": f"{slug}@{domain}",
+        "website": f"https://www.{domain}",
+    }
+
+
+def synthetic_listing(kind, state, index, settings=None):
+    """Build one RentCast-shaped listing (`kind` is "sale" or "rental")."""
+    settings = settings or SIMULATOR_DEFAULTS
+    seed = settings["seed"]
+    # Every fourth rental re-uses a sale property's address, so sale/rent matching has pairs to find
+    property_key = index if kind == "sale" or index % 4 == 0 else f"r{index}"
+    rng = _rng(seed, state, property_key)
+
+    lat, lon, zip_prefix = STATE_GEO.get(state, (39.8, -98.6, "669"))
+    city_no = rng.randrange(len(CITY_NAMES))
+    city = CITY_NAMES[city_no]
+    zip_code = f"{zip_prefix}{city_no * 7 + rng.randint(0, 6):02d}"
+    street = f"{rng.randint(100, 9999)} {rng.choice(STREET_NAMES)} {rng.choice(STREET_SUFFIXES)}"
+    unit = f"Apt {rng.randint(1, 40)}" if rng.random() < 0.15 else None
+    line = f"{street}, {unit}" if unit else street
+    property_type = rng.choice(PROPERTY_TYPES)
+    bedrooms = rng.randint(1, 6)
+    bathrooms = rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4])
+    sqft = rng.randint(450, 4800)
+    base_value = sqft * rng.uniform(110, 420)
+
+    listing_rng = _rng(seed, kind, state, index)
+    if kind == "sale":
+        price = round(base_value, -3)
+    else:
+        price = round(base_value * listing_rng.uniform(0.004, 0.009), -1)
+    if settings["churn_rate"] and _rng(seed, kind, state, index, settings["epoch"]).random() < settings["churn_rate"]:
+        price = round(price * (1 + listing_rng.uniform(-0.08, 0.05)), 0)
+
+    listed = datetime(2025, 1, 1) + timedelta(days=listing_rng.randint(0, 270), minutes=listing_rng.randint(0, 1439))
+    seen = listed + timedelta(days=listing_rng.randint(1, 60))
+    agent = f"{listing_rng.choice(FIRST_NAMES)} {listing_rng.choice(LAST_NAMES)}"
+    office = listing_rng.choice(OFFICE_NAMES)
+
+    return {
+        # the index keeps ids unique when two random addresses collide
+        "id": f"{line}, {city}, {state} {zip_code} {index}".replace(" ", "-").replace(",", ""),
+        "formattedAddress": f"{line}, {city}, {state} {zip_code}",
+        "addressLine1": street,
+        "addressLine2": unit,
+        "city": city,
+        "state": state,
+        "zipCode": zip_code,
+        "county": f"{city} County",
+        "latitude": round(lat + rng.uniform(-0.6, 0.6), 6),
+        "longitude": round(lon + rng.uniform(-0.6, 0.6), 6),
+        "propertyType": property_type,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "squareFootage": sqft,
+        "lotSize": rng.randint(1500, 20000) if property_type == "Single Family" else None,
+        "yearBuilt": rng.randint(1920, 2024),
+        "status": "Active",
+        "price": price,
+        "listingType": "Standard",
+        "listedDate": listed.isoformat() + ".000Z",
+        "removedDate": None,
+        "createdDate": listed.isoformat() + ".000Z",
+        "lastSeenDate": seen.isoformat() + ".000Z",
+        "daysOnMarket": (seen - listed).days,
+        "mlsName": f"{state}MLS",
+        "mlsNumber": str(listing_rng.randint(100000, 999999)),
+        "listingAgent": _contact(listing_rng, agent, "agents.example.com"),
+        "listingOffice": _contact(listing_rng, office, office.lower().replace(" ", "").replace("/", "") + ".example.com"),
+        "history": {
+            listed.date().isoformat(): {
+                "event": "Sale Listing" if kind == "sale" else "Rental Listing",
+                "price": price,
+                "listingType": "Standard",
+                "listedDate": listed.isoformat() + ".000Z",
+                "removedDate": None,
+                "daysOnMarket": (seen - listed).days,
+            }
+        },
+    }
+
+
+def listings_page(kind, params, settings):
+    """Apply the API's state/city filters and limit/offset pagination."""
+    states = [params["state"]] if params.get("state") else list(STATE_GEO)
+    limit = min(max(int(params.get("limit", DEFAULT_LISTINGS_PER_STATE)), 1), MAX_PAGE_SIZE)
+    offset = max(int(params.get("offset", 0)), 0)
+    city = params.get("city")
+    per_state = settings["listings_per_state"]
+
+    page = []
+    position = 0
+    for state in states:
+        if state not in STATE_GEO:
+            continue
+        if not city and position + per_state <= offset:
+            position += per_state  # skip whole states without generating them
+            continue
+        # listings only depend on their index, so without a city filter jump straight to the offset
+        start = 0 if city else max(offset - position, 0)
+        position += start
+        for index in range(start, per_state):
+            listing = synthetic_listing(kind, state, index, settings)
+            if city and listing["city"].lower() != city.lower():
+                continue
+            if position >= offset:
+                page.append(listing)
+                if len(page) == limit:
+                    return page
+            position += 1
+    return page
+
+
+class TokenBucket:
+    """Simple requests-per-second limiter used to produce 429 responses."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def make_handler(settings):
+    bucket = TokenBucket(settings["rate_limit"]) if settings["rate_limit"] else None
+    error_rng = random.Random(settings["seed"])
+    routes = {
+        "/v1/listings/sale": "sale",
+        "/v1/listings/rental/long-term": "rental",
+    }
+
+    class RentCastHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            kind = routes.get(url.path.rstrip("/"))
+            if kind is None:
+                return self._send(404, {"status": 404, "error": "not-found", "message": url.path})
+            if not self.headers.get("X-Api-Key"):
+                return self._send(401, {"status": 401, "error": "auth/api-key-missing"})
+            if bucket and not bucket.take():
+                return self._send(429, {"status": 429, "error": "rate-limit-exceeded"}, {"Retry-After": "1"})
+
+            if settings["latency_ms"] or settings["latency_jitter_ms"]:
+                delay = settings["latency_ms"] + error_rng.uniform(-1, 1) * settings["latency_jitter_ms"]
+                time.sleep(max(delay, 0) / 1000)
+            if settings["error_rate"] and error_rng.random() < settings["error_rate"]:
+                return self._send(503, {"status": 503, "error": "service-unavailable"})
+
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                page = listings_page(kind, params, settings)
+            except ValueError as e:
+                return self._send(400, {"status": 400, "error": "invalid-parameter", "message": str(e)})
+            self._send(200, page)
+
+        def log_message(self, format, *args):
+            pass  # keep load-test output readable
+
+    return RentCastHandler
+
+
+def make_server(host="127.0.0.1", port=8765, **overrides):
+    settings = {**SIMULATOR_DEFAULTS, **overrides}
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    server.settings = settings
+    return server
+
+
+def serve_in_background(host="127.0.0.1", port=0, **overrides):
+    """Start the simulator on a daemon thread; returns (server, base_url)."""
+    server = make_server(host, port, **overrides)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1/listings"
+
+
+def serve_in_subprocess(host="127.0.0.1", port=0, **overrides):
+    """Start the simulator in its own process, so a load test's timings don't include the
+    simulator's CPU time; returns (process, base_url). Stop it with process.terminate()."""
+    args = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(port)]
+    for key, value in overrides.items():
+        args += [f"--{key.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()  # "RentCast simulator listening on <base url>"
+    if not line:
+        raise RuntimeError(f"simulator exited with code {process.wait()}")
+    return process, line.split()[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RentCast listings API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--listings-per-state", type=int, default=SIMULATOR_DEFAULTS["listings_per_state"])
+    parser.add_argument("--latency-ms", type=float, default=SIMULATOR_DEFAULTS["latency_ms"])
+    parser.add_argument("--latency-jitter-ms", type=float, default=SIMULATOR_DEFAULTS["latency_jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=SIMULATOR_DEFAULTS["error_rate"])
+    parser.add_argument("--rate-limit", type=float, default=SIMULATOR_DEFAULTS["rate_limit"])
+    parser.add_argument("--churn-rate", type=float, default=SIMULATOR_DEFAULTS["churn_rate"])
+    parser.add_argument("--epoch", type=int, default=SIMULATOR_DEFAULTS["epoch"])
+    parser.add_argument("--seed", type=int, default=SIMULATOR_DEFAULTS["seed"])
+    args = vars(parser.parse_args())
+
+    server = make_server(args.pop("host"), args.pop("port"), **args)
+    host, port = server.server_address[:2]
+    print(f"RentCast simulator listening on http://{host}:{port}/v1/listings", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,180 @@
+# response_cache.py
+# Disk-backed cache of RentCast responses keyed by endpoint URL + normalised params.
+# Entries are gzip-compressed JSON; expiry uses the fetch time stored in the entry and
+# eviction is least-recently-used by file mtime (touched on every hit) and only scans the
+# cache once a running size total says it is over the limit.
+#
+#   python bronze_ingest.py --record   # fetch everything and keep a copy
+#   python bronze_ingest.py --replay   # rebuild bronze from the copy, no network
+#   python response_cache.py --stats | --clear
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+from config import RESPONSE_CACHE
+
+MODES = ("off", "cache", "record", "replay")
+
+# cache dir -> bytes on disk, scanned on the first write of the process and kept up to date
+# after that, so a store doesn't have to stat the whole tree to know whether to evict
+_dir_bytes = {}
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def set_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+    RESPONSE_CACHE["mode"] = mode
+
+
+def normalize_params(params):
+    """Order-independent, type-independent view of the query params ({"limit": 50} == {"limit": "50"})."""
+    normalized = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        value = str(value).strip()
+        if key == "state":
+            value = value.upper()
+        elif key == "status":
+            value = value.capitalize()
+        normalized[key] = value
+    return dict(sorted(normalized.items()))
+
+
+def cache_key(endpoint, params):
+    # Scheme and host are part of the key, so responses from the simulator (or any other
+    # server) are never served for the real API
+    url = urlparse(endpoint)
+    raw = json.dumps([url.scheme.lower(), url.netloc.lower(), url.path.rstrip("/"), normalize_params(params)],
+                     separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(RESPONSE_CACHE["dir"], key[:2], f"{key}.json.gz")
+
+
+def lookup(endpoint, params):
+    """Cached payload for this request, or None when the caller should hit the API."""
+    mode = RESPONSE_CACHE["mode"]
+    if mode in ("off", "record"):
+        return None
+
+    path = _entry_path(cache_key(endpoint, params))
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        if mode == "replay":
+            raise CacheMiss(f"No recorded response for {endpoint} {normalize_params(params)}")
+        return None
+
+    # Replay serves whatever was recorded, however old
+    if mode == "cache" and time.time() - entry["fetched_at"] > RESPONSE_CACHE["ttl_seconds"]:
+        return None
+    os.utime(path)  # mark as recently used for LRU eviction
+    return entry["payload"]
+
+
+def store(endpoint, params, payload):
+    if RESPONSE_CACHE["mode"] not in ("cache", "record"):
+        return
+    path = _entry_path(cache_key(endpoint, params))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {
+        "endpoint": endpoint,
+        "params": normalize_params(params),
+        "fetched_at": time.time(),
+        "payload": payload,
+    }
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(entry, f, separators=(",", ":"))
+    try:
+        replaced = os.path.getsize(path)
+    except FileNotFoundError:
+        replaced = 0
+    os.replace(tmp_path, path)  # readers never see a half-written entry
+
+    root = RESPONSE_CACHE["dir"]
+    if root in _dir_bytes:
+        _dir_bytes[root] += os.path.getsize(path) - replaced
+    else:
+        _dir_bytes[root] = sum(size for _, size, _ in _entries())
+    if _dir_bytes[root] > RESPONSE_CACHE["max_bytes"]:
+        evict()
+
+
+def _entries():
+    root = RESPONSE_CACHE["dir"]
+    if not os.path.isdir(root):
+        return []
+    entries = []
+    for shard in os.scandir(root):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(".json.gz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def evict(max_bytes=None):
+    """Drop least-recently-used entries until the cache fits in max_bytes (down to 90% of it)."""
+    max_bytes = RESPONSE_CACHE["max_bytes"] if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    _dir_bytes[RESPONSE_CACHE["dir"]] = total
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * 0.9:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    _dir_bytes[RESPONSE_CACHE["dir"]] = total
+    return removed
+
+
+def stats():
+    entries = _entries()
+    return {
+        "dir": RESPONSE_CACHE["dir"],
+        "mode": RESPONSE_CACHE["mode"],
+        "entries": len(entries),
+        "bytes": sum(size for _, size, _ in entries),
+        "max_bytes": RESPONSE_CACHE["max_bytes"],
+    }
+
+
+def clear():
+    removed = 0
+    for _, _, path in _entries():
+        os.remove(path)
+        removed += 1
+    _dir_bytes[RESPONSE_CACHE["dir"]] = 0
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the RentCast response cache")
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+    if args.clear:
+        print(f"Removed {clear()} cached responses")
+    print(json.dumps(stats(), indent=2))
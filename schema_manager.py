@@ -0,0 +1,196 @@
+# schema_manager.py
+# Declares the indexes the pipeline and dashboard queries rely on, creates them
+# idempotently, and can EXPLAIN (ANALYZE, BUFFERS) the canonical queries before and
+# after so the effect of each index is visible.
+#
+#   python schema_manager.py            # create any missing indexes
+#   python schema_manager.py --report   # plans/timings before and after creating them
+import argparse
+import json
+
+from config import POSTGRES
+from utils import get_db_connection
+
+# table may be a LIKE pattern (per-state bronze tables); {table} in the name is filled in
+INDEXES = [
+    # aggregate_to_gold: GROUP BY state WHERE price IS NOT NULL. Covering + partial, so the
+    # planner can switch to an index-only scan once the heap is much wider than these columns
+    {"table": "silver_sales", "name": "ix_silver_sales_state_priced",
+     "definition": "(state) INCLUDE (price, bedrooms, bathrooms, sqft) WHERE price IS NOT NULL"},
+    {"table": "silver_rentals", "name": "ix_silver_rentals_state_priced",
+     "definition": "(state) INCLUDE (price, bedrooms, bathrooms, sqft) WHERE price IS NOT NULL"},
+    # "last 7 days" range reads. A btree: upserts rewrite rows, so listed_date doesn't follow
+    # the physical order a BRIN would need
+    {"table": "silver_rentals", "name": "ix_silver_rentals_listed_date", "definition": "(listed_date)"},
+    # bronze is append-only: created_at correlates perfectly with physical order
+    {"table": "bronze\\_sales\\_%", "name": "brin_{table}_created_at", "definition": "USING brin (created_at)"},
+    {"table": "bronze\\_rentals\\_%", "name": "brin_{table}_created_at", "definition": "USING brin (created_at)"},
+    {"table": "bronze_change_events", "name": "brin_bronze_change_events_created_at",
+     "definition": "USING brin (created_at)"},
+    # geohash prefix range scans for geo_index.comparable_listings
+    {"table": "silver_sales", "name": "ix_silver_sales_geohash", "definition": "(geohash text_pattern_ops)"},
+    {"table": "silver_rentals", "name": "ix_silver_rentals_geohash", "definition": "(geohash text_pattern_ops)"},
+    # incremental gold reads: quantile_sketches.update_sketches scans version_seq > watermark
+    {"table": "silver_sales", "name": "ix_silver_sales_version_seq", "definition": "(version_seq)"},
+    {"table": "silver_rentals", "name": "ix_silver_rentals_version_seq", "definition": "(version_seq)"},
+    # yield_match equi-joins/lookups on the compact address and zip keys
+    {"table": "silver_sales", "name": "hx_silver_sales_address_key", "definition": "USING hash (address_key)"},
+    {"table": "silver_rentals", "name": "hx_silver_rentals_address_key", "definition": "USING hash (address_key)"},
+    {"table": "silver_sales", "name": "hx_silver_sales_zip5", "definition": "USING hash (zip5)"},
+    {"table": "silver_rentals", "name": "hx_silver_rentals_zip5", "definition": "USING hash (zip5)"},
+    {"table": "gold_yield_matches", "name": "hx_gold_yield_matches_zip5", "definition": "USING hash (zip5)"},
+    # dashboard.load_listings: sidebar filters, most selective first
+    {"table": "gold_sales_listings", "name": "ix_gold_sales_listings_filters",
+     "definition": "(state, city, property_type, status)"},
+    {"table": "gold_rental_listings", "name": "ix_gold_rental_listings_filters",
+     "definition": "(state, city, property_type, status)"},
+]
+# declarations that were replaced; ensure_indexes drops them where they still exist
+RETIRED_INDEXES = ["brin_silver_rentals_listed_date"]
+
+# name -> (sql, table whose most common state/city feed the parameters)
+CANONICAL_QUERIES = {
+    "gold.sales_summary": ("""
+        SELECT state, COUNT(*), AVG(price), AVG(bedrooms), AVG(bathrooms), AVG(sqft)
+        FROM silver_sales WHERE price IS NOT NULL GROUP BY state
+    """, None),
+    "gold.rentals_summary": ("""
+        SELECT state, COUNT(*), AVG(price), AVG(bedrooms), AVG(bathrooms), AVG(sqft)
+        FROM silver_rentals WHERE price IS NOT NULL GROUP BY state
+    """, None),
+    "silver.rentals_recent": ("""
+        SELECT COUNT(*), AVG(price) FROM silver_rentals
+        WHERE listed_date >= (SELECT MAX(listed_date) FROM silver_rentals) - INTERVAL '7 days'
+    """, None),
+    "dashboard.sales_filtered": ("""
+        SELECT * FROM gold_sales_listings
+        WHERE state = ANY(%(states)s) AND city = ANY(%(cities)s) LIMIT 5000
+    """, "gold_sales_listings"),
+    "dashboard.rentals_filtered": ("""
+        SELECT * FROM gold_rental_listings
+        WHERE state = ANY(%(states)s) AND city = ANY(%(cities)s) LIMIT 5000
+    """, "gold_rental_listings"),
+}
+
+
+def _matching_tables(cur, pattern):
+    cur.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name LIKE %s
+        ORDER BY table_name
+    """, [pattern])
+    return [r[0] for r in cur.fetchall()]
+
+
+def ensure_indexes(conn):
+    """Create every declared index whose table exists; returns the names created."""
+    created, touched = [], set()
+    with conn.cursor() as cur:
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")
+        existing = {r[0] for r in cur.fetchall()}
+        for name in RETIRED_INDEXES:
+            if name in existing:
+                cur.execute(f"DROP INDEX {name}")
+        for index in INDEXES:
+            for table in _matching_tables(cur, index["table"]):
+                name = index["name"].format(table=table)
+                if name in existing:
+                    continue
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {index['definition']}")
+                created.append(name)
+                touched.add(table)
+        for table in sorted(touched):
+            cur.execute(f"ANALYZE {table}")  # so the planner knows about the new index straight away
+    conn.commit()
+    return created
+
+
+def drop_indexes(conn):
+    """Remove the declared indexes (used to measure the 'before' side of a report)."""
+    with conn.cursor() as cur:
+        for index in INDEXES:
+            for table in _matching_tables(cur, index["table"]):
+                cur.execute(f"DROP INDEX IF EXISTS {index['name'].format(table=table)}")
+    conn.commit()
+
+
+def _params(cur, source_table):
+    if source_table is None:
+        return None
+    cur.execute(f"""
+        SELECT state, city FROM {source_table}
+        GROUP BY state, city ORDER BY COUNT(*) DESC LIMIT 1
+    """)
+    row = cur.fetchone()
+    return {"states": [row[0]] if row else [], "cities": [row[1]] if row else []}
+
+
+def _scans(plan):
+    """Leaf scan nodes of a JSON plan, e.g. "Index Only Scan ix_silver_sales_state_priced"."""
+    if "Plans" not in plan:
+        return [f"{plan['Node Type']} {plan.get('Index Name') or plan.get('Relation Name', '')}".strip()]
+    return [scan for child in plan["Plans"] for scan in _scans(child)]
+
+
+def explain_queries(conn):
+    """EXPLAIN (ANALYZE, BUFFERS) each canonical query whose tables exist."""
+    report = {}
+    with conn.cursor() as cur:
+        for name, (sql, source_table) in CANONICAL_QUERIES.items():
+            try:
+                params = _params(cur, source_table)
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+                result = cur.fetchone()[0]
+                explain = (json.loads(result) if isinstance(result, str) else result)[0]
+            except Exception as e:  # missing table etc.
+                conn.rollback()
+                report[name] = {"error": str(e).splitlines()[0]}
+                continue
+            plan = explain["Plan"]
+            report[name] = {
+                "node": plan["Node Type"],
+                "scans": _scans(plan),
+                "execution_ms": explain["Execution Time"],
+                "planning_ms": explain["Planning Time"],
+                "shared_hit": plan.get("Shared Hit Blocks", 0),
+                "shared_read": plan.get("Shared Read Blocks", 0),
+            }
+    conn.rollback()  # EXPLAIN ANALYZE ran read-only queries; nothing to keep
+    return report
+
+
+def print_report(before, after):
+    print(f"{'query':<28}{'before ms':>11}{'after ms':>11}{'buffers before':>16}{'buffers after':>15}  plan after")
+    for name in CANONICAL_QUERIES:
+        b, a = before.get(name, {}), after.get(name, {})
+        if "error" in a:
+            print(f"{name:<28}  skipped: {a['error']}")
+            continue
+        plan = f"{a['node']}: {', '.join(a['scans'])}"
+        print(f"{name:<28}{b.get('execution_ms', 0):>11.2f}{a['execution_ms']:>11.2f}"
+              f"{b.get('shared_hit', 0) + b.get('shared_read', 0):>16}"
+              f"{a['shared_hit'] + a['shared_read']:>15}  {plan}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the pipeline's indexes and report their effect")
+    parser.add_argument("--report", action="store_true",
+                        help="EXPLAIN (ANALYZE, BUFFERS) the canonical queries before and after")
+    parser.add_argument("--drop-first", action="store_true",
+                        help="drop the declared indexes before the 'before' measurement")
+    parser.add_argument("--json", dest="json_path", help="write the before/after report to this file")
+    args = parser.parse_args()
+
+    conn = get_db_connection(POSTGRES)
+    if args.drop_first:
+        drop_indexes(conn)
+    before = explain_queries(conn) if args.report else None
+    created = ensure_indexes(conn)
+    print(f"Created {len(created)} index(es): {', '.join(created) or 'none missing'}")
+    if args.report:
+        after = explain_queries(conn)
+        print_report(before, after)
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump({"before": before, "after": after}, f, indent=2)
+    conn.close()
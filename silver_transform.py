@@ -1,8 +1,17 @@
 import json
-import psycopg2
-from psycopg2.extras import execute_values
-from config import POSTGRES
-from utils import get_db_connection
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from config import PARQUET_LAKE, POSTGRES
+from utils import get_db_connection, get_watermark, set_watermark
+from schema_manager import ensure_indexes
+from change_detection import DELISTED, create_change_tables, listing_key
+import geo_index
+import yield_match
+from etl_recovery import (DONE, FAILED, checkpoint, create_recovery_tables, current_run_id, dead_letters,
+                          insert_with_fallback)
 
 # Define the fields we want to extract from the raw JSON for Silver
 SALES_FIELDS = [
@@ -20,11 +29,119 @@ SALES_FIELDS = [
 
 RENTAL_FIELDS = SALES_FIELDS + ["listedDate"]
 
+def _to_float(value, field, invalid):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        invalid[field] += 1
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            number = float(value)
+        else:
+            number = float(str(value).replace(",", "").replace("$", "").strip())
+    except (ValueError, OverflowError):
+        invalid[field] += 1
+        return None
+    if not math.isfinite(number):  # "nan"/"inf" parse as floats but aren't prices or sizes
+        invalid[field] += 1
+        return None
+    return number
+
+def _to_int(value, field, invalid):
+    number = _to_float(value, field, invalid)
+    if number is None:
+        return None
+    if not number.is_integer():
+        invalid[field] += 1
+        return None
+    return int(number)
+
+def _to_coordinate(value, field, invalid, limit):
+    number = _to_float(value, field, invalid)
+    if number is not None and not -limit <= number <= limit:
+        invalid[field] += 1
+        return None
+    return number
+
+def _to_timestamp(value, field, invalid):
+    """ISO-8601 string -> naive UTC datetime (silver columns are TIMESTAMP without time zone)."""
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"  # RentCast's "...Z"; fromisoformat only accepts it from Python 3.11
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        invalid[field] += 1
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@dataclass(slots=True)
+class ListingRecord:
+    """One silver listing, with every field already coerced to its column type."""
+    listing_id: str
+    address: Optional[str]
+    city: Optional[str]
+    state: Optional[str]
+    zip_code: Optional[str]
+    price: Optional[float]
+    bedrooms: Optional[int]
+    bathrooms: Optional[float]
+    sqft: Optional[int]
+    property_type: Optional[str]
+    status: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    geohash: Optional[str]
+    address_key: Optional[int]
+    zip5: Optional[int]
+    listed_date: Optional[datetime] = None
+
+    @classmethod
+    def from_raw(cls, record, listing_id, invalid, is_rental=False):
+        """Extract and coerce once; values that do not parse become NULL and are counted in `invalid`."""
+        get = record.get
+        latitude = _to_coordinate(get("latitude"), "latitude", invalid, 90)
+        longitude = _to_coordinate(get("longitude"), "longitude", invalid, 180)
+        has_point = latitude is not None and longitude is not None
+        return cls(
+            listing_id,
+            get("formattedAddress"),
+            get("city"),
+            get("state"),
+            get("zipCode"),
+            _to_float(get("price"), "price", invalid),
+            _to_int(get("bedrooms"), "bedrooms", invalid),
+            _to_float(get("bathrooms"), "bathrooms", invalid),
+            _to_int(get("squareFootage"), "sqft", invalid),
+            get("propertyType"),
+            get("status"),
+            latitude,
+            longitude,
+            geo_index.encode(latitude, longitude) if has_point else None,
+            yield_match.address_key(get("formattedAddress"), get("zipCode")),
+            yield_match.zip5(get("zipCode")),
+            _to_timestamp(get("listedDate"), "listed_date", invalid) if is_rental else None,
+        )
+
+    def as_row(self, is_rental=False):
+        row = (self.listing_id, self.address, self.city, self.state, self.zip_code, self.price,
+               self.bedrooms, self.bathrooms, self.sqft, self.property_type, self.status,
+               self.latitude, self.longitude, self.geohash, self.address_key, self.zip5)
+        return row + (self.listed_date,) if is_rental else row
+
 def create_silver_tables(conn):
     with conn.cursor() as cur:
+        # Bumped on every insert/update so gold can pick up just the rows that changed
+        cur.execute("CREATE SEQUENCE IF NOT EXISTS silver_version_seq")
         cur.execute("""
         CREATE TABLE IF NOT EXISTS silver_sales (
             id SERIAL PRIMARY KEY,
+            listing_id TEXT,
             address TEXT,
             city TEXT,
             state TEXT,
@@ -34,12 +151,19 @@ def create_silver_tables(conn):
             bathrooms NUMERIC,
             sqft INT,
             property_type TEXT,
-            status TEXT
+            status TEXT,
+            latitude DOUBLE PRECISION,
+            longitude DOUBLE PRECISION,
+            geohash TEXT,
+            address_key BIGINT,
+            zip5 INT,
+            version_seq BIGINT DEFAULT nextval('silver_version_seq')
         );
         """)
         cur.execute("""
         CREATE TABLE IF NOT EXISTS silver_rentals (
             id SERIAL PRIMARY KEY,
+            listing_id TEXT,
             address TEXT,
             city TEXT,
             state TEXT,
@@ -50,97 +174,223 @@ def create_silver_tables(conn):
             sqft INT,
             property_type TEXT,
             status TEXT,
-            listed_date TIMESTAMP
+            latitude DOUBLE PRECISION,
+            longitude DOUBLE PRECISION,
+            geohash TEXT,
+            address_key BIGINT,
+            zip5 INT,
+            listed_date TIMESTAMP,
+            version_seq BIGINT DEFAULT nextval('silver_version_seq')
         );
         """)
+        # Silver keeps the latest version of each listing; bronze only holds changes
+        for table in ("silver_sales", "silver_rentals"):
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS listing_id TEXT")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS geohash TEXT")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS address_key BIGINT")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS zip5 INT")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS version_seq BIGINT "
+                        "DEFAULT nextval('silver_version_seq')")
+            cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_listing_id_key ON {table} (listing_id)")
     conn.commit()
+    if not get_watermark(conn, "migration:silver_listing_id"):
+        with conn.cursor() as cur:
+            # Rows stored before listing_id existed can never be upserted; the keyed transform
+            # re-reads bronze from the start and stores them again, so drop the unkeyed copies
+            # once instead of counting those listings twice in gold
+            for table in ("silver_sales", "silver_rentals"):
+                cur.execute(f"DELETE FROM {table} WHERE listing_id IS NULL")
+            set_watermark(cur, "migration:silver_listing_id", 1)
+        conn.commit()
+    create_change_tables(conn)  # transform_table applies bronze's delisted events
+    create_recovery_tables(conn)  # transform_table dead-letters bad records
+
+def apply_delistings(conn, cur, bronze_table, silver_table):
+    """Mark listings that bronze reported delisted since the last run Inactive in silver.
 
-def transform_table(conn, bronze_table, silver_table, is_rental=False):
-    """Read raw bronze JSON and insert into the structured silver table."""
+    Listings that came back since (active again in the listing index) are left alone; the
+    version_seq bump lets the incremental gold steps pick the status change up. With the
+    Parquet copy on, the flipped rows are appended to it too. Returns how many were flipped.
+    """
+    watermark = get_watermark(conn, f"delisted:{bronze_table}")
+    cur.execute("SELECT COALESCE(MAX(id), %s) FROM bronze_change_events WHERE bronze_table = %s",
+                [watermark, bronze_table])
+    last_event = cur.fetchone()[0]
+    if last_event == watermark:
+        return 0
+    is_rental = silver_table == "silver_rentals"
+    cur.execute(f"""
+        UPDATE {silver_table} s SET status = 'Inactive', version_seq = nextval('silver_version_seq')
+        FROM (SELECT DISTINCT e.listing_id FROM bronze_change_events e
+              JOIN bronze_listing_index i ON i.bronze_table = e.bronze_table AND i.listing_id = e.listing_id
+              WHERE e.bronze_table = %s AND e.change_type = %s AND e.id > %s AND e.id <= %s
+                AND NOT i.active) d
+        WHERE s.listing_id = d.listing_id AND s.status IS DISTINCT FROM 'Inactive'
+        RETURNING s.listing_id, s.address, s.city, s.state, s.zip_code, s.price, s.bedrooms, s.bathrooms,
+                  s.sqft, s.property_type, s.status, s.latitude, s.longitude, s.geohash, s.address_key,
+                  s.zip5{", s.listed_date" if is_rental else ""}
+    """, [bronze_table, DELISTED, watermark, last_event])
+    delisted = cur.fetchall()
+    if PARQUET_LAKE["enabled"] and delisted:
+        # in the same transaction as the watermark, so a failed lake write leaves the events to redo
+        import parquet_store  # pyarrow is only needed when the Parquet copy is on
+        parquet_store.write_silver("rentals" if is_rental else "sales", delisted)
+    set_watermark(cur, f"delisted:{bronze_table}", last_event)
+    return len(delisted)
+
+def transform_table(conn, bronze_table, silver_table, is_rental=False, run_id=None):
+    """Read bronze JSON added since the last run and upsert it into the structured silver table.
+
+    Records that can't be parsed or stored go to etl_dead_letters; the rest still load.
+    """
+    watermark = get_watermark(conn, bronze_table)
     with conn.cursor() as cur:
-        cur.execute(f"SELECT raw_json FROM {bronze_table}")
+        cur.execute(f"SELECT id, raw_json FROM {bronze_table} WHERE id > %s ORDER BY id", [watermark])
         rows = cur.fetchall()
-    
-    records = []
-    for (raw_json,) in rows:
-        if isinstance(raw_json, str):
-            record = json.loads(raw_json)
-        else:
-            record = raw_json  # already JSONB/dict
-
-        if not record:
-            continue
-        
-        # Extract fields safely with .get()
-        row = [
-            record.get("formattedAddress"),
-            record.get("city"),
-            record.get("state"),
-            record.get("zipCode"),
-            record.get("price"),
-            record.get("bedrooms"),
-            record.get("bathrooms"),
-            record.get("squareFootage"),
-            record.get("propertyType"),
-            record.get("status")
-        ]
-        if is_rental:
-            # Add listedDate for rentals if available
-            listed_date = record.get("listedDate")
-            row.append(listed_date)
-        records.append(row)
-    
-    if records:
+    if not rows:
         with conn.cursor() as cur:
+            apply_delistings(conn, cur, bronze_table, silver_table)
+        conn.commit()
+        return Counter()
+
+    records = {}
+    invalid = Counter()
+    rejected = []  # (record key, payload, error) for the dead-letter queue
+    for bronze_id, raw_json in rows:
+        try:
+            if isinstance(raw_json, str):
+                record = json.loads(raw_json)
+            else:
+                record = raw_json  # already JSONB/dict
+
+            if not record:
+                continue
+
+            listing_id = listing_key(record)  # same key as bronze's change detection
+            # a later bronze version of the same listing wins
+            records[listing_id] = ListingRecord.from_raw(record, listing_id, invalid, is_rental)
+        except Exception as e:
+            rejected.append((bronze_id, raw_json, repr(e)))
+
+    failed_ids = set()
+
+    def reject_row(record, error):
+        failed_ids.add(record.listing_id)
+        rejected.append((record.listing_id, list(record.as_row(is_rental)), repr(error)))
+
+    with conn.cursor() as cur:
+        if records:
             if is_rental:
                 insert_query = """
                 INSERT INTO silver_rentals 
-                (address, city, state, zip_code, price, bedrooms, bathrooms, sqft, property_type, status, listed_date)
+                (listing_id, address, city, state, zip_code, price, bedrooms, bathrooms, sqft, property_type, status,
+                 latitude, longitude, geohash, address_key, zip5, listed_date)
                 VALUES %s
+                ON CONFLICT (listing_id) DO UPDATE SET
+                    address = EXCLUDED.address, city = EXCLUDED.city, state = EXCLUDED.state,
+                    zip_code = EXCLUDED.zip_code, price = EXCLUDED.price, bedrooms = EXCLUDED.bedrooms,
+                    bathrooms = EXCLUDED.bathrooms, sqft = EXCLUDED.sqft, property_type = EXCLUDED.property_type,
+                    status = EXCLUDED.status, latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude,
+                    geohash = EXCLUDED.geohash, address_key = EXCLUDED.address_key, zip5 = EXCLUDED.zip5,
+                    listed_date = EXCLUDED.listed_date,
+                    version_seq = nextval('silver_version_seq')
                 """
             else:
                 insert_query = """
                 INSERT INTO silver_sales 
-                (address, city, state, zip_code, price, bedrooms, bathrooms, sqft, property_type, status)
+                (listing_id, address, city, state, zip_code, price, bedrooms, bathrooms, sqft, property_type, status,
+                 latitude, longitude, geohash, address_key, zip5)
                 VALUES %s
+                ON CONFLICT (listing_id) DO UPDATE SET
+                    address = EXCLUDED.address, city = EXCLUDED.city, state = EXCLUDED.state,
+                    zip_code = EXCLUDED.zip_code, price = EXCLUDED.price, bedrooms = EXCLUDED.bedrooms,
+                    bathrooms = EXCLUDED.bathrooms, sqft = EXCLUDED.sqft, property_type = EXCLUDED.property_type,
+                    status = EXCLUDED.status, latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude,
+                    geohash = EXCLUDED.geohash, address_key = EXCLUDED.address_key, zip5 = EXCLUDED.zip5,
+                    version_seq = nextval('silver_version_seq')
                 """
-            execute_values(cur, insert_query, records)
+            # one bad row (e.g. an out-of-range sqft) falls back to row-by-row instead of losing the batch
+            insert_with_fallback(cur, insert_query, records.values(), reject_row,
+                                 as_row=lambda record: record.as_row(is_rental))
+        dead_letters(cur, run_id or current_run_id(), "silver", bronze_table, rejected)
+        apply_delistings(conn, cur, bronze_table, silver_table)
+        if PARQUET_LAKE["enabled"] and records:
+            # before the watermark moves, so a failed lake write leaves the rows to be re-read
+            import parquet_store  # pyarrow is only needed when the Parquet copy is on
+            parquet_store.write_silver_records("rentals" if is_rental else "sales",
+                                               (r for r in records.values() if r.listing_id not in failed_ids))
+        # Advance past every row read, including empty ones, in the same transaction
+        set_watermark(cur, bronze_table, rows[-1][0])
+    conn.commit()
+    return invalid
+
+def transform_unit(conn, bronze_table, run_id=None):
+    """transform_table as a checkpointed unit; returns the invalid counts, or None if it failed."""
+    run_id = run_id or current_run_id()
+    is_rental = bronze_table.startswith("bronze_rentals_")
+    state = bronze_table.rsplit("_", 1)[-1].upper()
+    try:
+        invalid = transform_table(conn, bronze_table, "silver_rentals" if is_rental else "silver_sales",
+                                  is_rental, run_id)
+    except Exception as e:
+        conn.rollback()  # the watermark didn't move, so a retry re-reads the same rows
+        with conn.cursor() as cur:
+            checkpoint(cur, run_id, "silver", bronze_table, 0, FAILED, state, error=repr(e))
         conn.commit()
+        return None
+    with conn.cursor() as cur:
+        checkpoint(cur, run_id, "silver", bronze_table, 0, DONE, state)
+    conn.commit()
+    return invalid
 
-def run_silver():
-    conn = get_db_connection(POSTGRES)
-    create_silver_tables(conn)
-    
-    # Process all bronze_sales_* tables
+def bronze_state_tables(conn):
+    """All bronze_sales_* tables, then all bronze_rentals_* tables."""
     with conn.cursor() as cur:
         cur.execute("SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'bronze_sales_%'")
         bronze_sales_tables = [r[0] for r in cur.fetchall()]
-    for table in bronze_sales_tables:
-        transform_table(conn, table, "silver_sales", is_rental=False)
-
-    # Process all bronze_rentals_* tables
-    with conn.cursor() as cur:
         cur.execute("SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'bronze_rentals_%'")
         bronze_rentals_tables = [r[0] for r in cur.fetchall()]
-    for table in bronze_rentals_tables:
-        transform_table(conn, table, "silver_rentals", is_rental=True)
+    return bronze_sales_tables + bronze_rentals_tables
+
+def run_silver(run_id=None):
+    run_id = run_id or current_run_id()
+    conn = get_db_connection(POSTGRES)
+    create_silver_tables(conn)
+    
+    invalid = Counter()
+    failed = []
+    for table in bronze_state_tables(conn):
+        result = transform_unit(conn, table, run_id)
+        if result is None:
+            failed.append(table)
+        else:
+            invalid += result
 
+    ensure_indexes(conn)  # also picks up bronze tables created since the last run
     conn.close()
-    print("Silver transformation complete!")
+    if failed:
+        print(f"Silver transformation failed for {', '.join(failed)}; "
+              f"retry with: python etl_recovery.py resume --run-id {run_id}")
+    else:
+        print("Silver transformation complete!")
+    if invalid:
+        print("Invalid values stored as NULL: " + ", ".join(f"{field}={count}" for field, count in sorted(invalid.items())))
 
 if __name__ == "__main__":
     run_silver()
 
 #To handle Logging & Error Handling issues at the silver Layer
 import json
-import psycopg2
-import pandas as pd
 from config import POSTGRES
 from utils import get_db_connection, create_table_if_not_exists
 from logging_config import logger
+from etl_recovery import create_recovery_tables, current_run_id, dead_letters, insert_with_fallback
 
 def load_bronze(table_name):
     """Load raw JSON from Bronze table into DataFrame"""
+    import pandas as pd  # only the DataFrame path needs it; keeps startup cheap
     try:
         conn = get_db_connection(POSTGRES)
         df = pd.read_sql(f"SELECT raw_json FROM {table_name}", conn)
@@ -153,6 +403,7 @@ def load_bronze(table_name):
 
 def transform_sales(df):
     """Transform Bronze sales JSON into structured Silver schema"""
+    import pandas as pd
     try:
         records = df["raw_json"].apply(json.loads).tolist()
         sales_df = pd.json_normalize(records)
@@ -180,6 +431,7 @@ def transform_sales(df):
 
 def transform_rentals(df):
     """Transform Bronze rentals JSON into structured Silver schema"""
+    import pandas as pd
     try:
         records = df["raw_json"].apply(json.loads).tolist()
         rentals_df = pd.json_normalize(records)
@@ -213,13 +465,19 @@ def save_to_silver(table_name, df):
         conn = get_db_connection(POSTGRES)
         cur = conn.cursor()
         create_table_if_not_exists(conn, table_name, df)  # utils should handle schema
-        for _, row in df.iterrows():
-            cur.execute(
-                f"INSERT INTO {table_name} ({', '.join(df.columns)}) VALUES ({', '.join(['%s']*len(df.columns))})",
-                tuple(row)
-            )
+        create_recovery_tables(conn)
+        # One batch; if a row is rejected, retry row by row and dead-letter only the bad rows
+        rejected = []
+        inserted = insert_with_fallback(
+            cur, f"INSERT INTO {table_name} ({', '.join(df.columns)}) VALUES %s",
+            [tuple(row) for _, row in df.iterrows()],
+            lambda row, e: rejected.append((None, list(row), repr(e))),
+        )
+        dead_letters(cur, current_run_id(), "silver", table_name, rejected)
         conn.commit()
-        logger.info(f"Inserted {len(df)} rows into {table_name}")
+        logger.info(f"Inserted {inserted} rows into {table_name}")
+        if rejected:
+            logger.warning(f"{len(rejected)} rows for {table_name} moved to etl_dead_letters")
     except Exception as e:
         logger.error(f"Error saving to Silver table {table_name}: {e}", exc_info=True)
     finally:
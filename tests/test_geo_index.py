@@ -0,0 +1,100 @@
+import math
+import random
+
+import pytest
+
+import geo_index
+from geo_index import bounds, center, covering_cells, encode, haversine_miles, neighbors
+
+AUSTIN = (30.2672, -97.7431)
+
+
+def test_encode_known_values():
+    # reference values from the original geohash.org examples
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert encode(42.6, -5.6, 5) == "ezs42"
+    assert encode(*AUSTIN, 5) == "9v6kp"
+
+
+def test_bounds_and_center_contain_the_point():
+    cell = encode(*AUSTIN)
+    lat_lo, lat_hi, lon_lo, lon_hi = bounds(cell)
+    assert lat_lo <= AUSTIN[0] < lat_hi and lon_lo <= AUSTIN[1] < lon_hi
+    assert encode(*center(cell), len(cell)) == cell
+
+
+def test_neighbors_are_the_adjacent_block():
+    cell = encode(*AUSTIN, 6)
+    block = neighbors(cell)
+    assert len(block) == 9 and cell in block
+    lat_lo, lat_hi, lon_lo, lon_hi = bounds(cell)
+    for other in block:
+        o_lat_lo, o_lat_hi, o_lon_lo, o_lon_hi = bounds(other)
+        # each neighbour touches the cell's edges or corners
+        assert o_lat_lo == pytest.approx(lat_lo, abs=1e-9) or o_lat_hi == pytest.approx(lat_lo) \
+            or o_lat_lo == pytest.approx(lat_hi)
+        assert o_lon_lo == pytest.approx(lon_lo, abs=1e-9) or o_lon_hi == pytest.approx(lon_lo) \
+            or o_lon_lo == pytest.approx(lon_hi)
+
+
+def test_neighbors_wrap_the_antimeridian():
+    cell = encode(0.0, 179.99, 4)
+    assert any(center(other)[1] < 0 for other in neighbors(cell))
+
+
+@pytest.mark.parametrize("lat, lon, radius", [
+    (*AUSTIN, 0.25), (*AUSTIN, 1.0), (*AUSTIN, 5.0), (*AUSTIN, 25.0), (64.84, -147.72, 3.0),
+    (0.0, 179.99, 2.0),
+])
+def test_covering_cells_contain_the_circle(lat, lon, radius):
+    cells = set(covering_cells(lat, lon, radius))
+    precision = len(next(iter(cells)))
+    assert len(cells) <= geo_index.MAX_COVER_CELLS
+    assert {len(cell) for cell in cells} == {precision}
+
+    rng = random.Random(3)
+    for _ in range(500):
+        bearing, distance = rng.uniform(0, 2 * math.pi), radius * math.sqrt(rng.random())
+        p_lat = lat + distance * math.cos(bearing) / 69.05
+        p_lon = lon + distance * math.sin(bearing) / (69.17 * math.cos(math.radians(lat)))
+        p_lon = (p_lon + 180) % 360 - 180
+        if haversine_miles(lat, lon, p_lat, p_lon) <= radius:
+            assert encode(p_lat, p_lon, precision) in cells
+
+
+def test_covering_cells_stay_fine_for_small_radii():
+    # a quarter mile must not fall back to ~24-mile cells the way a 3x3 block did
+    cells = covering_cells(*AUSTIN, 0.25)
+    height, width = geo_index.cell_size_miles(len(cells[0]), AUSTIN[0])
+    assert len(cells) * height * width < 4
+
+
+def test_comparable_listings_nearest_first(db_conn):
+    import silver_transform
+
+    silver_transform.create_silver_tables(db_conn)
+    rng = random.Random(5)
+    rows = []
+    for i in range(400):
+        lat = AUSTIN[0] + rng.uniform(-0.1, 0.1)
+        lon = AUSTIN[1] + rng.uniform(-0.1, 0.1)
+        rows.append((f"L{i}", "TX", "Austin", "Condo", "Active", 300_000, lat, lon, encode(lat, lon)))
+    with db_conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO silver_sales (listing_id, state, city, property_type, status, price,
+                                      latitude, longitude, geohash)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    db_conn.commit()
+
+    radius = 2.0
+    expected = sorted(
+        (haversine_miles(*AUSTIN, lat, lon), listing_id)
+        for listing_id, *_, lat, lon, _cell in rows
+        if haversine_miles(*AUSTIN, lat, lon) <= radius
+    )
+    found = geo_index.comparable_listings(db_conn, *AUSTIN, radius_miles=radius, limit=10)
+    assert [listing["listing_id"] for listing in found] == [listing_id for _, listing_id in expected[:10]]
+    assert [listing["distance_miles"] for listing in found] == [round(d, 3) for d, _ in expected[:10]]
+    everything = geo_index.comparable_listings(db_conn, *AUSTIN, radius_miles=radius, limit=1_000)
+    assert len(everything) == len(expected)
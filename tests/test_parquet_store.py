@@ -0,0 +1,67 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import parquet_store  # noqa: E402
+from config import PARQUET_LAKE  # noqa: E402
+
+T0 = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def lake(tmp_path, monkeypatch):
+    monkeypatch.setitem(PARQUET_LAKE, "dir", str(tmp_path))
+    return tmp_path
+
+
+def _row(listing_id, state, price, status="Active", bedrooms=3):
+    return (listing_id, f"{listing_id} Main St", "Austin", state, "78701", price, bedrooms, 2.0, 1500,
+            "Single Family", status, 30.27, -97.74, "9v6kp", 12345, 78701)
+
+
+def _files(lake):
+    return sorted(name for _, _, files in os.walk(lake) for name in files)
+
+
+def test_silver_round_trip_keeps_the_newest_version():
+    parquet_store.write_silver("sales", [_row("a", "TX", 100), _row("b", "TX", 300), _row("c", "CA", 500)], T0)
+    parquet_store.write_silver("sales", [_row("a", "TX", 200, bedrooms=4)], T0 + timedelta(minutes=1))
+
+    latest = parquet_store.latest_silver("sales", columns=["price", "bedrooms"]).to_pylist()
+    assert sorted((r["listing_id"], r["price"], r["bedrooms"]) for r in latest) == \
+        [("a", 200.0, 4), ("b", 300.0, 3), ("c", 500.0, 3)]
+    assert sorted(parquet_store.summarize_silver("sales")) == [
+        ("CA", 1, 500.0, 3.0, 2.0, 1500.0),
+        ("TX", 2, 250.0, 3.5, 2.0, 1500.0),
+    ]
+    assert parquet_store.latest_silver("sales", states=["CA"]).num_rows == 1
+
+
+def test_summary_skips_delisted_listings():
+    parquet_store.write_silver("rentals", [_row("a", "TX", 1000) + (None,), _row("b", "TX", 2000) + (None,)], T0)
+    parquet_store.write_silver("rentals", [_row("b", "TX", 2000, status="Inactive") + (None,)],
+                               T0 + timedelta(minutes=1))
+    assert [row[:3] for row in parquet_store.summarize_silver("rentals")] == [("TX", 1, 1000.0)]
+
+
+def test_compact_merges_each_partition(lake):
+    for minute in range(3):
+        parquet_store.write_silver("sales", [_row(f"L{minute}", "TX", 100 + minute), _row(f"M{minute}", "CA", 1)],
+                                   T0 + timedelta(minutes=minute))
+    assert len(_files(lake)) == 6
+
+    assert parquet_store.compact("silver", "sales") == 4
+    assert len(_files(lake)) == 2  # one per state partition
+    assert parquet_store.latest_silver("sales").num_rows == 6
+    assert parquet_store.compact("silver", "sales") == 0
+
+
+def test_bronze_round_trip():
+    parquet_store.write_bronze("bronze_sales_tx", [{"id": "x", "state": "TX", "price": "1,000"},
+                                                   {"id": "y", "state": "TX", "price": 250000}], T0)
+    table = parquet_store.scan("bronze", "sales", columns=["listing_id", "price"], states=["TX"])
+    assert sorted(table.to_pylist(), key=lambda r: r["listing_id"]) == [
+        {"listing_id": "x", "price": None}, {"listing_id": "y", "price": 250000.0}]
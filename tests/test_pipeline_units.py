@@ -0,0 +1,124 @@
+import pytest
+
+import bronze_ingest
+import gold_load
+import parquet_store
+import silver_transform
+from config import BRONZE_PAGING, PARQUET_LAKE
+from etl_recovery import DONE, FAILED
+from utils import get_watermark
+
+RUN_ID = "test-run"
+TABLE = "bronze_sales_tx"
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A fake RentCast sale endpoint paging over `listings` by offset/limit."""
+    listings = [{"id": f"L{i}", "formattedAddress": f"{i} Elm St", "state": "TX", "price": 100_000 + i}
+                for i in range(25)]
+
+    def fetch(endpoint, params):
+        offset = params.get("offset", 0)
+        return listings[offset:offset + params["limit"]]
+
+    monkeypatch.setattr(bronze_ingest, "_fetch_or_raise", fetch)
+    monkeypatch.setitem(BRONZE_PAGING, "page_size", 10)
+    monkeypatch.setitem(BRONZE_PAGING, "max_pages", 5)
+    return listings
+
+
+def _active(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT listing_id FROM bronze_listing_index WHERE bronze_table = %s AND active", [TABLE])
+        return {row[0] for row in cur.fetchall()}
+
+
+def test_multi_page_fetch_marks_missing_listings_delisted(db_conn, api):
+    assert bronze_ingest.ingest_state("sales", "TX", "run-1") == 0
+    assert len(_active(db_conn)) == 25
+
+    del api[17], api[3]
+    assert bronze_ingest.ingest_state("sales", "TX", "run-2") == 0
+    assert _active(db_conn) == {f"L{i}" for i in range(25)} - {"L3", "L17"}
+
+
+def test_truncated_fetch_delists_nothing(db_conn, api, monkeypatch):
+    bronze_ingest.ingest_state("sales", "TX", "run-1")
+    del api[0]
+
+    monkeypatch.setitem(BRONZE_PAGING, "max_pages", 2)  # stops on a full page
+    bronze_ingest.ingest_state("sales", "TX", "run-2")
+    monkeypatch.setitem(BRONZE_PAGING, "max_pages", 1)
+    bronze_ingest.ingest_state("sales", "TX", "run-3")
+    assert len(_active(db_conn)) == 25
+
+
+def test_short_single_page_delists_itself(db_conn, api):
+    bronze_ingest.ingest_state("sales", "TX", "run-1")
+    del api[5:]
+    bronze_ingest.ingest_state("sales", "TX", "run-2")
+    assert _active(db_conn) == {f"L{i}" for i in range(5)}
+
+
+def test_delisted_listings_leave_gold(db_conn, api, monkeypatch):
+    silver_transform.create_silver_tables(db_conn)
+    gold_load.create_gold_tables(db_conn)
+    bronze_ingest.ingest_state("sales", "TX", "run-1")
+    silver_transform.transform_unit(db_conn, TABLE, "run-1")
+
+    snapshots = []
+    monkeypatch.setitem(PARQUET_LAKE, "enabled", True)
+    monkeypatch.setattr(parquet_store, "write_silver", lambda kind, rows: snapshots.extend(rows))
+    del api[17], api[3]
+    bronze_ingest.ingest_state("sales", "TX", "run-2")
+    assert silver_transform.apply_delistings(db_conn, db_conn.cursor(), TABLE, "silver_sales") == 2
+    db_conn.commit()
+    assert sorted((row[0], row[10]) for row in snapshots) == [("L17", "Inactive"), ("L3", "Inactive")]
+
+    monkeypatch.setitem(PARQUET_LAKE, "enabled", False)
+    gold_load.load_gold(db_conn)
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT total_listings FROM gold_sales_summary WHERE state = 'TX'")
+        assert cur.fetchone()[0] == 23
+
+
+def _checkpoints(conn, stage):
+    with conn.cursor() as cur:
+        cur.execute("SELECT page, status FROM etl_checkpoints WHERE stage = %s ORDER BY page", [stage])
+        return cur.fetchall()
+
+
+def test_failed_lake_write_fails_the_bronze_unit(db_conn, api, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setitem(PARQUET_LAKE, "enabled", True)
+    monkeypatch.setattr(parquet_store, "write_bronze", broken)
+    monkeypatch.setitem(BRONZE_PAGING, "max_pages", 1)
+    assert bronze_ingest.ingest_state("sales", "TX", RUN_ID) == 1
+    assert _checkpoints(db_conn, "bronze") == [(0, FAILED)]
+    assert _active(db_conn) == set()  # rolled back with the unit
+
+
+def test_failed_lake_write_keeps_the_silver_watermark(db_conn, api, monkeypatch):
+    monkeypatch.setitem(BRONZE_PAGING, "max_pages", 1)
+    bronze_ingest.ingest_state("sales", "TX", RUN_ID)
+    silver_transform.create_silver_tables(db_conn)
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setitem(PARQUET_LAKE, "enabled", True)
+    monkeypatch.setattr(parquet_store, "write_silver_records", broken)
+    assert silver_transform.transform_unit(db_conn, TABLE, RUN_ID) is None
+    assert get_watermark(db_conn, TABLE) == 0
+
+    written = []
+    monkeypatch.setattr(parquet_store, "write_silver_records", lambda kind, records: written.extend(records))
+    assert silver_transform.transform_unit(db_conn, TABLE, RUN_ID) is not None
+    assert len(written) == 10
+    assert _checkpoints(db_conn, "silver") == [(0, DONE)]
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM silver_sales")
+        assert cur.fetchone()[0] == 10
@@ -0,0 +1,116 @@
+import bisect
+import random
+
+import pytest
+
+import quantile_sketches
+from quantile_sketches import HISTOGRAM_EDGES, Distribution, KLLSketch
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+MAX_RANK_ERROR = 0.02  # KLL_K=200 targets ~1.3%; leave room for the random compactions
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    quantile_sketches._random.seed(7)
+
+
+def rank_error(sketch, values, q):
+    ordered = sorted(values)
+    rank = bisect.bisect_right(ordered, sketch.quantile(q)) / len(ordered)
+    return abs(rank - q)
+
+
+def test_rank_error_within_bound():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(12, 0.6) for _ in range(100_000)]
+    sketch = KLLSketch()
+    for value in values:
+        sketch.update(value)
+
+    assert sketch.n == len(values)
+    assert sketch.min == min(values) and sketch.max == max(values)
+    for q in QUANTILES:
+        assert rank_error(sketch, values, q) <= MAX_RANK_ERROR, q
+    # bounded memory: far fewer retained items than values
+    assert sum(len(items) for items in sketch.levels) < 2_000
+
+
+def test_merge_matches_one_stream():
+    rng = random.Random(2)
+    parts = [[rng.uniform(0, 1_000) * (i + 1) for _ in range(20_000)] for i in range(5)]
+    merged = KLLSketch()
+    for part in parts:
+        sketch = KLLSketch()
+        for value in part:
+            sketch.update(value)
+        merged.merge(sketch)
+
+    values = [value for part in parts for value in part]
+    assert merged.n == len(values)
+    assert merged.min == min(values) and merged.max == max(values)
+    for q in QUANTILES:
+        assert rank_error(merged, values, q) <= MAX_RANK_ERROR, q
+
+
+def test_json_round_trip_and_empty():
+    sketch = KLLSketch()
+    assert sketch.quantile(0.5) is None
+    for value in range(1, 5_001):
+        sketch.update(value)
+    restored = KLLSketch.from_json(sketch.to_json())
+    assert restored.n == sketch.n
+    assert [restored.quantile(q) for q in QUANTILES] == [sketch.quantile(q) for q in QUANTILES]
+    restored.update(0)  # still usable after loading
+    assert restored.min == 0
+
+
+def test_distribution_merge_adds_histograms_and_totals():
+    edges = HISTOGRAM_EDGES[("rentals", "price")]
+    a, b = Distribution(edges), Distribution(edges)
+    for value in (1_000, 2_000, 3_000):
+        a.add(value, edges)
+    b.add(100_000, edges)  # past the last edge: overflow bucket
+
+    a.merge(b)
+    assert sum(a.histogram) == 4
+    assert a.histogram[-1] == 1
+    assert a.total == 106_000
+    assert a.sketch.n == 4
+
+
+def test_rebuild_skips_legacy_rows(db_conn):
+    import silver_transform
+
+    silver_transform.create_silver_tables(db_conn)
+    with db_conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO silver_sales (listing_id, state, city, property_type, status, price, sqft)
+            VALUES (%s, 'TX', 'Austin', 'Condo', 'Active', %s, %s)
+        """, [(f"L{i}", 200_000 + i * 1_000, 900) for i in range(10)])
+        # rows stored before listing_id existed (the migration already ran for this database)
+        cur.executemany("""
+            INSERT INTO silver_sales (state, city, property_type, status, price, sqft)
+            VALUES ('TX', 'Austin', 'Condo', 'Active', %s, 900)
+        """, [(5_000_000,), (6_000_000,)])
+    db_conn.commit()
+
+    quantile_sketches.create_sketch_tables(db_conn)
+    assert quantile_sketches.rebuild_sketches(db_conn, "sales") == 1
+    summary = quantile_sketches.summarize(db_conn, "sales", states=["TX"])
+    assert summary["listings"] == 10
+    assert summary["max"] == 209_000
+    assert summary["mean"] == pytest.approx(204_500)
+
+    # the incremental path skips them too
+    with db_conn.cursor() as cur:
+        cur.execute("UPDATE silver_sales SET version_seq = nextval('silver_version_seq') WHERE listing_id IS NULL")
+        cur.execute("""
+            INSERT INTO silver_sales (listing_id, state, city, property_type, status, price, sqft)
+            VALUES ('L10', 'TX', 'Austin', 'Condo', 'Active', 300000, 900)
+        """)
+    db_conn.commit()
+    quantile_sketches.update_sketches(db_conn, "sales")
+    summary = quantile_sketches.summarize(db_conn, "sales", states=["TX"])
+    assert summary["listings"] == 11
+    assert summary["max"] == 300_000
@@ -0,0 +1,36 @@
+from rentcast_simulator import SIMULATOR_DEFAULTS, STATE_GEO, listings_page, synthetic_listing
+
+SETTINGS = {**SIMULATOR_DEFAULTS, "listings_per_state": 2_000}
+
+
+def test_pages_match_the_listings_in_order():
+    # without a state filter the pages run through every state in turn
+    first_two = list(STATE_GEO)[:2]
+    everything = [synthetic_listing("sale", state, i, SETTINGS) for state in first_two for i in range(2_000)]
+    for offset in (0, 450, 1_999, 2_000, 3_500):
+        page = listings_page("sale", {"limit": 500, "offset": offset}, SETTINGS)
+        assert page == everything[offset:offset + 500]
+
+
+def test_state_pages_cover_the_state_once():
+    pages = [listings_page("rental", {"state": "TX", "limit": 500, "offset": offset}, SETTINGS)
+             for offset in range(0, 2_500, 500)]
+    assert [len(page) for page in pages] == [500, 500, 500, 500, 0]
+    ids = [listing["id"] for page in pages for listing in page]
+    assert len(set(ids)) == 2_000
+
+
+def test_city_filter_pages():
+    city = synthetic_listing("sale", "TX", 0, SETTINGS)["city"]
+    matches = [listing for listing in (synthetic_listing("sale", "TX", i, SETTINGS) for i in range(2_000))
+               if listing["city"] == city]
+    page = listings_page("sale", {"state": "TX", "city": city, "limit": 500, "offset": 10}, SETTINGS)
+    assert page == matches[10:510]
+
+
+def test_ids_unique_when_addresses_collide():
+    listings = [synthetic_listing("sale", "TX", i, {**SIMULATOR_DEFAULTS, "listings_per_state": 20_000})
+                for i in range(20_000)]
+    addresses = [listing["formattedAddress"] for listing in listings]
+    assert len(set(addresses)) < len(addresses)  # the generator does produce duplicates
+    assert len({listing["id"] for listing in listings}) == len(listings)
@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+import response_cache
+from config import RESPONSE_CACHE
+
+API = "https://api.rentcast.io/v1/listings/sale"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(RESPONSE_CACHE, "dir", str(tmp_path))
+    monkeypatch.setitem(RESPONSE_CACHE, "mode", "cache")
+    monkeypatch.setitem(RESPONSE_CACHE, "ttl_seconds", 3600)
+    monkeypatch.setitem(RESPONSE_CACHE, "max_bytes", 1 << 30)
+    response_cache._dir_bytes.clear()
+    return tmp_path
+
+
+def test_equivalent_params_share_a_key():
+    assert response_cache.normalize_params({"state": "tx", "limit": 50, "status": "active", "offset": None}) == \
+        {"limit": "50", "state": "TX", "status": "Active"}
+    assert response_cache.cache_key(API, {"state": "TX", "limit": 50}) == \
+        response_cache.cache_key(API + "/", {"limit": "50", "state": "tx"})
+
+
+def test_hosts_do_not_share_entries(cache):
+    response_cache.store("http://127.0.0.1:8080/v1/listings/sale", {"state": "TX"}, [{"id": "simulated"}])
+    assert response_cache.lookup(API, {"state": "TX"}) is None
+    assert response_cache.lookup("http://127.0.0.1:8080/v1/listings/sale", {"state": "TX"}) == [{"id": "simulated"}]
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    response_cache.store(API, {"state": "TX"}, [1])
+    assert response_cache.lookup(API, {"state": "TX"}) == [1]
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3601)
+    assert response_cache.lookup(API, {"state": "TX"}) is None
+
+    # replay serves whatever was recorded, however old
+    monkeypatch.setitem(RESPONSE_CACHE, "mode", "replay")
+    assert response_cache.lookup(API, {"state": "TX"}) == [1]
+
+
+def test_replay_raises_on_unrecorded_requests(cache, monkeypatch):
+    monkeypatch.setitem(RESPONSE_CACHE, "mode", "replay")
+    with pytest.raises(response_cache.CacheMiss):
+        response_cache.lookup(API, {"state": "CA"})
+    response_cache.store(API, {"state": "CA"}, [1])  # replay never writes
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_eviction_drops_least_recently_used(cache, monkeypatch):
+    payload = [{"blob": os.urandom(2048).hex()}]  # incompressible, so entry sizes are predictable
+    for i, state in enumerate(("AL", "AK", "AZ")):
+        response_cache.store(API, {"state": state}, payload)
+        path = response_cache._entry_path(response_cache.cache_key(API, {"state": state}))
+        os.utime(path, (1000 + i, 1000 + i))
+    response_cache.lookup(API, {"state": "AL"})  # the oldest becomes the most recently used
+
+    size = response_cache.stats()["bytes"] // 3
+    monkeypatch.setitem(RESPONSE_CACHE, "max_bytes", int(size * 3.5))
+    response_cache.store(API, {"state": "AR"}, payload)
+    assert response_cache.lookup(API, {"state": "AK"}) is None
+    assert response_cache.lookup(API, {"state": "AL"}) == payload
+    assert response_cache.lookup(API, {"state": "AR"}) == payload
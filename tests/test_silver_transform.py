@@ -0,0 +1,74 @@
+import math
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from silver_transform import ListingRecord, _to_float, _to_int, _to_timestamp
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("$1,200", 1200.0),
+    (" 350000.50 ", 350000.5),
+    (1200, 1200.0),
+    (None, None),
+    ("", None),
+])
+def test_to_float_parses_prices(value, expected):
+    invalid = Counter()
+    assert _to_float(value, "price", invalid) == expected
+    assert not invalid
+
+
+@pytest.mark.parametrize("value", ["nan", float("nan"), "inf", "-Infinity", "1e400", "abc", True])
+def test_to_float_rejects_non_numbers(value):
+    invalid = Counter()
+    assert _to_float(value, "price", invalid) is None
+    assert invalid == {"price": 1}
+
+
+def test_to_int_rejects_fractions():
+    invalid = Counter()
+    assert _to_int("3", "bedrooms", invalid) == 3
+    assert _to_int("2,100.0", "sqft", invalid) == 2100
+    assert not invalid
+    assert _to_int("2.5", "bedrooms", invalid) is None
+    assert invalid == {"bedrooms": 1}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-10-01T00:00:00.000Z", datetime(2026, 10, 1)),
+    ("2026-10-01T00:00:00z", datetime(2026, 10, 1)),
+    ("2026-10-01T02:30:00+02:00", datetime(2026, 10, 1, 0, 30)),
+    ("2026-10-01", datetime(2026, 10, 1)),
+])
+def test_to_timestamp_normalizes_to_naive_utc(value, expected):
+    invalid = Counter()
+    assert _to_timestamp(value, "listed_date", invalid) == expected
+    assert not invalid
+
+
+def test_to_timestamp_counts_garbage():
+    invalid = Counter()
+    assert _to_timestamp("last Tuesday", "listed_date", invalid) is None
+    assert invalid == {"listed_date": 1}
+
+
+def test_from_raw_coerces_and_counts_bad_fields():
+    raw = {
+        "formattedAddress": "12 Oak St, Austin, TX 78701", "city": "Austin", "state": "TX", "zipCode": "78701",
+        "price": "$2,450", "bedrooms": "2.5", "bathrooms": "nan", "squareFootage": "1,100",
+        "propertyType": "Condo", "status": "Active", "latitude": 95.2, "longitude": -97.74,
+        "listedDate": "2026-09-30T12:00:00Z",
+    }
+    invalid = Counter()
+    record = ListingRecord.from_raw(raw, "L1", invalid, is_rental=True)
+
+    assert (record.price, record.bedrooms, record.bathrooms, record.sqft) == (2450.0, None, None, 1100)
+    assert record.latitude is None and record.longitude == -97.74
+    assert record.geohash is None  # no point without a valid latitude
+    assert record.listed_date == datetime(2026, 9, 30, 12)
+    assert record.zip5 == 78701
+    assert invalid == {"bedrooms": 1, "bathrooms": 1, "latitude": 1}
+    assert len(record.as_row(is_rental=True)) == len(record.as_row()) + 1
+    assert not any(isinstance(v, float) and math.isnan(v) for v in record.as_row(is_rental=True))
@@ -0,0 +1,103 @@
+import pytest
+
+import yield_match
+from yield_match import address_key, normalize_address, zip5
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("123 North Main Street Apt 4", "123 N MAIN ST # 4"),
+    ("123 N Main St #4", "123 N MAIN ST # 4"),
+    ("123 N. Main St., Apt. #4", "123 N MAIN ST # 4"),
+    ("123 N Main St, Unit 4, Austin, TX 78701", "123 N MAIN ST # 4"),
+    ("500 Congress Avenue Suite 210", "500 CONGRESS AVE # 210"),
+    ("12 Oak Lane No. 3", "12 OAK LN # 3"),
+    ("45 No Name Rd", "45 NO NAME RD"),
+    ("45 No Name Rd, Austin, TX 78701", "45 NO NAME RD"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_address(address, expected):
+    assert normalize_address(address) == expected
+
+
+@pytest.mark.parametrize("zip_code, expected", [
+    ("78701", 78701), ("02134-1234", 2134), (78701, 78701), ("7870", None), (None, None),
+])
+def test_zip5(zip_code, expected):
+    assert zip5(zip_code) == expected
+
+
+def test_address_key_matches_spellings_of_one_property():
+    key = address_key("123 North Main Street Apt 4, Austin, TX 78701", "78701")
+    assert key == address_key("123 N Main St #4", "78701-0001")
+    assert -2 ** 63 <= key < 2 ** 63
+    assert key != address_key("123 N Main St #5", "78701")
+    assert key != address_key("123 N Main St #4", "78702")
+    assert address_key("45 No Name Rd", "78701") != address_key("45 # Name Rd", "78701")
+    assert address_key("", "78701") is None and address_key("123 Main St", None) is None
+
+
+def _insert(cur, kind, listing_id, address, zip_code, price):
+    cur.execute(f"""
+        INSERT INTO silver_{kind} (listing_id, address, zip_code, price, property_type, status, address_key, zip5)
+        VALUES (%s, %s, %s, %s, 'Condo', 'Active', %s, %s)
+        ON CONFLICT (listing_id) DO UPDATE SET
+            address = EXCLUDED.address, zip_code = EXCLUDED.zip_code, price = EXCLUDED.price,
+            address_key = EXCLUDED.address_key, zip5 = EXCLUDED.zip5,
+            version_seq = nextval('silver_version_seq')
+    """, [listing_id, address, zip_code, price, address_key(address, zip_code), zip5(zip_code)])
+
+
+def _matches(cur):
+    cur.execute("SELECT zip5, sale_listing_id, rental_listing_id FROM gold_yield_matches ORDER BY zip5")
+    return cur.fetchall()
+
+
+def test_address_change_rematches_the_old_property(db_conn):
+    import silver_transform
+
+    silver_transform.create_silver_tables(db_conn)
+    yield_match.create_yield_tables(db_conn)
+    with db_conn.cursor() as cur:
+        _insert(cur, "sales", "S1", "1 Elm St", "78701", 400_000)
+        _insert(cur, "rentals", "R1", "1 Elm St", "78701", 2_000)
+        _insert(cur, "sales", "S2", "9 Oak Ave", "78702", 300_000)
+    db_conn.commit()
+    yield_match.refresh_yields(db_conn)
+    with db_conn.cursor() as cur:
+        assert _matches(cur) == [(78701, "S1", "R1")]
+
+        # the rental was keyed to the wrong address: it now belongs to S2's property
+        _insert(cur, "rentals", "R1", "9 Oak Ave", "78702", 2_000)
+        db_conn.commit()
+        _, zips, _ = yield_match.refresh_yields(db_conn)
+        assert zips == [78701, 78702]
+        assert _matches(cur) == [(78702, "S2", "R1")]
+        cur.execute("SELECT rental_listings FROM yield_by_zip WHERE zip5 = 78701")
+        assert cur.fetchone()[0] == 0
+
+
+def test_rebuild_backfills_legacy_keys(db_conn):
+    import silver_transform
+
+    silver_transform.create_silver_tables(db_conn)
+    yield_match.create_yield_tables(db_conn)
+    with db_conn.cursor() as cur:
+        # rows stored before address_key/zip5 were computed
+        cur.execute("""
+            INSERT INTO silver_sales (listing_id, address, zip_code, price, property_type)
+            VALUES ('S1', '1 Elm Street', '78701', 400000, 'Condo')
+        """)
+        cur.execute("""
+            INSERT INTO silver_rentals (listing_id, address, zip_code, price, property_type)
+            VALUES ('R1', '1 Elm St', '78701-0042', 2000, 'Condo')
+        """)
+    db_conn.commit()
+
+    yield_match.refresh_yields(db_conn, rebuild=True)
+    with db_conn.cursor() as cur:
+        assert _matches(cur) == [(78701, "S1", "R1")]
+        cur.execute("SELECT address_key, zip5 FROM silver_sales")
+        assert cur.fetchone() == (address_key("1 Elm St", "78701"), 78701)
+        cur.execute("SELECT kind, listing_id, zip5 FROM gold_yield_members ORDER BY kind")
+        assert cur.fetchall() == [("rentals", "R1", 78701), ("sales", "S1", 78701)]
@@ -1,7 +1,6 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
-
 def get_db_connection(config):
+    import psycopg2  # imported on first connect so importing utils stays cheap
+
     conn = psycopg2.connect(
         host=config["host"],
         port=config["port"],
@@ -22,9 +21,31 @@ def create_table_if_not_exists(conn, table_name):
         """)
         conn.commit()
         
-from config import POSTGRES
-from utils import get_db_connection
+def get_watermark(conn, name):
+    """Highest source id already processed for `name` (0 if never run)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS etl_watermarks (
+                name TEXT PRIMARY KEY,
+                last_id BIGINT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cur.execute("SELECT last_id FROM etl_watermarks WHERE name = %s", [name])
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+def set_watermark(cur, name, last_id):
+    """Record progress; runs on the caller's cursor so it commits with the data."""
+    cur.execute("""
+        INSERT INTO etl_watermarks (name, last_id) VALUES (%s, %s)
+        ON CONFLICT (name) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = CURRENT_TIMESTAMP
+    """, [name, last_id])
+
+if __name__ == "__main__":
+    # Connection smoke test: python utils.py
+    from config import POSTGRES
 
-conn = get_db_connection(POSTGRES)
-print("Connected to PostgreSQL!")
-conn.close()
+    conn = get_db_connection(POSTGRES)
+    print("Connected to PostgreSQL!")
+    conn.close()
@@ -0,0 +1,355 @@
+# yield_match.py
+# Matches sale and rental listings of the same property and rolls gross rental yield
+# (annual rent / sale price) up by zip code and property type.
+#
+# Silver carries two compact keys computed during the transform: address_key, a 64-bit
+# hash of the normalised street address + zip, and zip5, the zip code as an integer. Both
+# have hash indexes, so matching is an integer equi-join instead of a join on free-text
+# addresses, and incremental runs only touch the zips/types whose listings changed.
+#
+#   python yield_match.py             # refresh what changed since the last run
+#   python yield_match.py --rebuild   # recompute the keys of older silver rows and rematch everything
+import argparse
+import hashlib
+import re
+from datetime import datetime
+
+from utils import get_watermark, set_watermark
+
+# USPS street suffix / directional / unit abbreviations, so "123 North Main Street Apt 4"
+# and "123 N Main St #4" get the same key
+_ABBREVIATIONS = {
+    "STREET": "ST", "AVENUE": "AVE", "AV": "AVE", "ROAD": "RD", "DRIVE": "DR", "BOULEVARD": "BLVD",
+    "LANE": "LN", "COURT": "CT", "PLACE": "PL", "TERRACE": "TER", "CIRCLE": "CIR", "PARKWAY": "PKWY",
+    "HIGHWAY": "HWY", "TRAIL": "TRL", "SQUARE": "SQ", "WAY": "WAY",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+    "APARTMENT": "#", "APT": "#", "UNIT": "#", "SUITE": "#", "STE": "#",
+}
+# "NO" is only a unit marker when a number follows ("Main St No 4"), not in "45 No Name Rd"
+_UNIT_IF_NUMBERED = {"NO"}
+_NON_WORD = re.compile(r"[^A-Z0-9#]+")
+_STATE_ZIP = re.compile(r"^[A-Z]{2}\s*\d{5}(-\d{4})?$")
+YIELD_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def zip5(zip_code):
+    """"02134-1234" -> 2134 (render with f"{zip5:05d}"); None when there are no 5 digits."""
+    digits = re.sub(r"\D", "", str(zip_code or ""))[:5]
+    return int(digits) if len(digits) == 5 else None
+
+
+def normalize_address(address):
+    """Street line (+ unit) of an address, upper-cased, punctuation-free and abbreviated."""
+    parts = [part.strip() for part in str(address or "").upper().split(",")]
+    # "line, [unit,] city, ST 12345": drop the city and "ST 12345" parts
+    if len(parts) >= 3 and _STATE_ZIP.match(parts[-1]):
+        parts = parts[:-2]
+    tokens = _NON_WORD.sub(" ", " ".join(parts).replace("#", " # ")).split()
+    normalized = []
+    for i, token in enumerate(tokens):
+        if token in _UNIT_IF_NUMBERED:
+            following = tokens[i + 1] if i + 1 < len(tokens) else ""
+            token = "#" if any(char.isdigit() for char in following) else token
+        token = _ABBREVIATIONS.get(token, token)
+        if token == "#" and normalized and normalized[-1] == "#":
+            continue  # "APT #4"
+        normalized.append(token)
+    return " ".join(normalized)
+
+
+def address_key(address, zip_code):
+    """Signed 64-bit key (fits BIGINT) for the property at this address, or None."""
+    street, code = normalize_address(address), zip5(zip_code)
+    if not street or code is None:
+        return None
+    digest = hashlib.blake2b(f"{street}|{code}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def create_yield_tables(conn):
+    with conn.cursor() as cur:
+        # One row per property listed both for sale and for rent
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold_yield_matches (
+            address_key BIGINT PRIMARY KEY,
+            zip5 INT,
+            property_type TEXT,
+            sale_listing_id TEXT,
+            rental_listing_id TEXT,
+            sale_price NUMERIC,
+            monthly_rent NUMERIC,
+            gross_yield NUMERIC
+        );
+        """)
+        # Which address key / zip each listing was last matched under, so a listing whose
+        # address changes also gets its old property rematched
+        cur.execute("SELECT to_regclass('gold_yield_members') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            cur.execute("""
+            CREATE TABLE gold_yield_members (
+                kind TEXT NOT NULL,
+                listing_id TEXT NOT NULL,
+                address_key BIGINT,
+                zip5 INT,
+                PRIMARY KEY (kind, listing_id)
+            );
+            """)
+            # matches made before listings were tracked: rebuild them on the next run
+            get_watermark(conn, "yield:silver_sales")  # creates etl_watermarks if needed
+            cur.execute("DELETE FROM etl_watermarks WHERE name LIKE 'yield:%'")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS yield_by_zip (
+            zip5 INT PRIMARY KEY,
+            zip_code TEXT,
+            sale_listings INT,
+            median_sale_price NUMERIC,
+            rental_listings INT,
+            median_rent NUMERIC,
+            market_yield NUMERIC,
+            matched_properties INT,
+            avg_yield NUMERIC,
+            yield_p10 NUMERIC,
+            yield_p25 NUMERIC,
+            median_yield NUMERIC,
+            yield_p75 NUMERIC,
+            yield_p90 NUMERIC,
+            updated_at TIMESTAMP
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS yield_by_property_type (
+            property_type TEXT PRIMARY KEY,
+            matched_properties INT,
+            median_sale_price NUMERIC,
+            median_rent NUMERIC,
+            avg_yield NUMERIC,
+            yield_p10 NUMERIC,
+            yield_p25 NUMERIC,
+            median_yield NUMERIC,
+            yield_p75 NUMERIC,
+            yield_p90 NUMERIC,
+            updated_at TIMESTAMP
+        );
+        """)
+    conn.commit()
+
+
+# silver keeps delisted listings (status Inactive); gold only counts the ones still listed
+_ACTIVE = "status IS DISTINCT FROM 'Inactive'"
+
+
+def _changed(cur, kind, watermark):
+    """(listing_id, address_key, zip5, version_seq, previous address_key, previous zip5) of
+    silver_<kind> rows changed since the watermark."""
+    cur.execute(f"""
+        SELECT s.listing_id, s.address_key, s.zip5, s.version_seq, m.address_key, m.zip5
+        FROM silver_{kind} s
+        LEFT JOIN gold_yield_members m ON m.kind = %s AND m.listing_id = s.listing_id
+        WHERE s.version_seq > %s
+    """, [kind, watermark])
+    return cur.fetchall()
+
+
+def _track_members(cur, kind, rows):
+    from psycopg2.extras import execute_values
+    members = [(kind, row[0], row[1], row[2]) for row in rows if row[0] is not None]
+    if members:
+        execute_values(cur, """
+            INSERT INTO gold_yield_members (kind, listing_id, address_key, zip5) VALUES %s
+            ON CONFLICT (kind, listing_id) DO UPDATE SET
+                address_key = EXCLUDED.address_key, zip5 = EXCLUDED.zip5
+        """, members)
+
+
+def _rebuild_members(cur):
+    cur.execute("DELETE FROM gold_yield_members")
+    for kind in ("sales", "rentals"):
+        cur.execute(f"""
+            INSERT INTO gold_yield_members (kind, listing_id, address_key, zip5)
+            SELECT DISTINCT ON (listing_id) %s, listing_id, address_key, zip5 FROM silver_{kind}
+            WHERE listing_id IS NOT NULL
+            ORDER BY listing_id, version_seq DESC
+        """, [kind])
+
+
+def backfill_keys(conn, batch_size=10_000):
+    """Compute address_key/zip5 for silver rows stored before the keys existed.
+
+    Runs before every rebuild. Rows are updated in place without a new version_seq, since
+    the rebuild that follows rematches everything anyway. Returns the rows updated.
+    """
+    from psycopg2.extras import execute_values
+    updated = 0
+    for table in ("silver_sales", "silver_rentals"):
+        with conn.cursor(name=f"yield_keys_{table}") as read:  # server-side cursor, streamed
+            read.execute(f"""
+                SELECT listing_id, address, zip_code FROM {table}
+                WHERE (address_key IS NULL OR zip5 IS NULL) AND zip_code IS NOT NULL AND listing_id IS NOT NULL
+            """)
+            with conn.cursor() as cur:
+                while True:
+                    rows = read.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    keys = [(listing_id, address_key(address, zip_code), zip5(zip_code))
+                            for listing_id, address, zip_code in rows]
+                    keys = [row for row in keys if row[1] is not None or row[2] is not None]
+                    if keys:
+                        execute_values(cur, f"""
+                            UPDATE {table} t SET address_key = v.address_key, zip5 = v.zip5
+                            FROM (VALUES %s) AS v (listing_id, address_key, zip5)
+                            WHERE t.listing_id = v.listing_id
+                        """, keys, template="(%s, %s::bigint, %s::int)")
+                        updated += len(keys)
+    conn.commit()
+    return updated
+
+
+def _last_version(cur, table):
+    cur.execute(f"SELECT COALESCE(MAX(version_seq), 0) FROM {table}")
+    return cur.fetchone()[0]
+
+
+def _rematch(cur, keys):
+    """Recompute gold_yield_matches for these address keys (all when keys is None).
+
+    Returns the (zip5, property_type) of every match removed or added, i.e. the groups to refresh.
+    """
+    where = "address_key = ANY(%(keys)s::bigint[])" if keys is not None else "TRUE"
+    params = {"keys": keys}
+    cur.execute(f"DELETE FROM gold_yield_matches WHERE {where} RETURNING zip5, property_type", params)
+    affected = set(cur.fetchall())
+    # newest version of each property on either side; delisted listings and ones without a
+    # usable price never match
+    cur.execute(f"""
+        INSERT INTO gold_yield_matches
+        SELECT s.address_key, s.zip5, COALESCE(s.property_type, ''), s.listing_id, r.listing_id,
+               s.price, r.price, r.price * 12 / s.price
+        FROM (SELECT DISTINCT ON (address_key) address_key, zip5, property_type, listing_id, price
+              FROM silver_sales WHERE {where} AND price > 0 AND {_ACTIVE}
+              ORDER BY address_key, version_seq DESC) s
+        JOIN (SELECT DISTINCT ON (address_key) address_key, listing_id, price
+              FROM silver_rentals WHERE {where} AND price > 0 AND {_ACTIVE}
+              ORDER BY address_key, version_seq DESC) r
+          ON r.address_key = s.address_key
+        RETURNING zip5, property_type
+    """, params)
+    return affected | set(cur.fetchall())
+
+
+_QUANTILE_COLUMNS = """
+    AVG(gross_yield) AS avg_yield,
+    percentile_cont(ARRAY[{}]) WITHIN GROUP (ORDER BY gross_yield) AS yield_quantiles
+""".format(", ".join(str(q) for q in YIELD_QUANTILES))
+
+
+def _refresh_zips(cur, zips, now):
+    where = "zip5 = ANY(%(zips)s::int[])" if zips is not None else "zip5 IS NOT NULL"
+    params = {"zips": zips, "now": now}
+    cur.execute(f"DELETE FROM yield_by_zip WHERE {where}", params)
+    # market_yield uses every listing in the zip; the yield distribution only matched properties
+    cur.execute(f"""
+        WITH sales AS (
+            SELECT zip5, COUNT(*) AS listings, percentile_cont(0.5) WITHIN GROUP (ORDER BY price) AS median
+            FROM silver_sales WHERE {where} AND price > 0 AND {_ACTIVE} GROUP BY zip5
+        ), rentals AS (
+            SELECT zip5, COUNT(*) AS listings, percentile_cont(0.5) WITHIN GROUP (ORDER BY price) AS median
+            FROM silver_rentals WHERE {where} AND price > 0 AND {_ACTIVE} GROUP BY zip5
+        ), matches AS (
+            SELECT zip5, COUNT(*) AS properties, {_QUANTILE_COLUMNS}
+            FROM gold_yield_matches WHERE {where} GROUP BY zip5
+        )
+        INSERT INTO yield_by_zip
+        SELECT zip5, lpad(zip5::text, 5, '0'),
+               COALESCE(s.listings, 0), s.median, COALESCE(r.listings, 0), r.median,
+               r.median * 12 / NULLIF(s.median, 0),
+               COALESCE(m.properties, 0), m.avg_yield,
+               m.yield_quantiles[1], m.yield_quantiles[2], m.yield_quantiles[3],
+               m.yield_quantiles[4], m.yield_quantiles[5],
+               %(now)s
+        FROM sales s FULL JOIN rentals r USING (zip5) FULL JOIN matches m USING (zip5)
+    """, params)
+
+
+def _refresh_property_types(cur, property_types, now):
+    where = "property_type = ANY(%(types)s::text[])" if property_types is not None else "TRUE"
+    params = {"types": property_types, "now": now}
+    cur.execute(f"DELETE FROM yield_by_property_type WHERE {where}", params)
+    cur.execute(f"""
+        INSERT INTO yield_by_property_type
+        SELECT property_type, properties, median_sale_price, median_rent,
+               avg_yield, yield_quantiles[1], yield_quantiles[2], yield_quantiles[3],
+               yield_quantiles[4], yield_quantiles[5], %(now)s
+        FROM (
+            SELECT property_type, COUNT(*) AS properties,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY sale_price) AS median_sale_price,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY monthly_rent) AS median_rent,
+                   {_QUANTILE_COLUMNS}
+            FROM gold_yield_matches WHERE {where} GROUP BY property_type
+        ) m
+    """, params)
+
+
+def refresh_yields(conn, rebuild=False):
+    """Rematch properties whose sale or rental listing changed and refresh their zips/types.
+
+    A listing whose address or zip changed is rematched under both its old and new key,
+    using gold_yield_members. A rebuild first backfills the keys of older silver rows.
+    Returns (zip/property-type groups whose matches changed, zips refreshed, property types
+    refreshed); None means all of them.
+    """
+    sales_mark = get_watermark(conn, "yield:silver_sales")
+    rentals_mark = get_watermark(conn, "yield:silver_rentals")
+    rebuild = rebuild or not (sales_mark or rentals_mark)
+    if rebuild:
+        backfill_keys(conn)
+    now = datetime.now()
+    with conn.cursor() as cur:
+        if rebuild:
+            sales_mark, rentals_mark = _last_version(cur, "silver_sales"), _last_version(cur, "silver_rentals")
+            affected = _rematch(cur, None)
+            _rebuild_members(cur)
+            zips, property_types = None, None
+        else:
+            sales = _changed(cur, "sales", sales_mark)
+            rentals = _changed(cur, "rentals", rentals_mark)
+            if not sales and not rentals:
+                return 0, [], []
+            sales_mark = max([sales_mark] + [row[3] for row in sales])
+            rentals_mark = max([rentals_mark] + [row[3] for row in rentals])
+            changed = sales + rentals
+            affected = _rematch(cur, sorted({key for row in changed for key in (row[1], row[4]) if key is not None}))
+            # a changed listing moves its zips' medians even when it matches nothing
+            zips = sorted({z for z, _ in affected if z is not None}
+                          | {z for row in changed for z in (row[2], row[5]) if z is not None})
+            property_types = sorted({t for _, t in affected})
+            _track_members(cur, "sales", sales)
+            _track_members(cur, "rentals", rentals)
+        _refresh_zips(cur, zips, now)
+        _refresh_property_types(cur, property_types, now)
+        set_watermark(cur, "yield:silver_sales", sales_mark)
+        set_watermark(cur, "yield:silver_rentals", rentals_mark)
+    conn.commit()
+    return len(affected), zips, property_types
+
+
+def run_yield(conn, rebuild=False):
+    create_yield_tables(conn)
+    changed, zips, property_types = refresh_yields(conn, rebuild)
+    print(f"Yield: matches changed in {changed} zip/type group(s), "
+          f"{'all' if zips is None else len(zips)} zip(s), "
+          f"{'all' if property_types is None else len(property_types)} property type(s) refreshed")
+
+
+if __name__ == "__main__":
+    from config import POSTGRES
+    from utils import get_db_connection
+
+    parser = argparse.ArgumentParser(description="Refresh the rent-to-price yield tables")
+    parser.add_argument("--rebuild", action="store_true", help="rematch every property from silver")
+    args = parser.parse_args()
+
+    conn = get_db_connection(POSTGRES)
+    run_yield(conn, rebuild=args.rebuild)
+    conn.close()